@@ -36,9 +36,9 @@ async def generate_image_caption(
         
         # Generate caption using BLIP-2
         if prompt:
-            result = blip2_service.generate_text_with_image(temp_path, prompt)
+            result = await blip2_service.generate_text_with_image_async(temp_path, prompt)
         else:
-            result = blip2_service.generate_caption(temp_path)
+            result = await blip2_service.generate_caption_async(temp_path)
         
         # Clean up temporary file
         os.remove(temp_path)
@@ -82,7 +82,7 @@ async def answer_image_question(
             f.write(content)
         
         # Answer question using BLIP-2
-        answer = blip2_service.answer_question(temp_path, question)
+        answer = await blip2_service.answer_question_async(temp_path, question)
         
         # Clean up temporary file
         os.remove(temp_path)
@@ -126,7 +126,7 @@ async def describe_image(
             f.write(content)
         
         # Generate detailed description using BLIP-2
-        description = blip2_service.generate_text_with_image(
+        description = await blip2_service.generate_text_with_image_async(
             temp_path, 
             "Describe this image in detail. Mention objects, colors, composition, and any text present."
         )
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from typing import List
 import uuid
 import os
@@ -10,7 +11,7 @@ from models.content import (
     ContentType, ProcessingStatus
 )
 from services.upload_service import process_file_upload
-from services.query_service import semantic_search_and_answer
+from services.query_service import semantic_search_and_answer, semantic_search_and_answer_stream
 from services.agent_service import execute_agent_workflow
 from services.metadata_service import get_content_metadata
 
@@ -109,6 +110,21 @@ async def query_content(request: QueryRequest):
         raise HTTPException(status_code=500, detail=f"Query failed: {str(e)}")
 
 
+@router.post("/query/stream")
+async def query_content_stream(request: QueryRequest):
+    """
+    Perform semantic search and stream the AI-powered response as server-sent events
+    """
+    return StreamingResponse(
+        semantic_search_and_answer_stream(
+            query=request.query,
+            top_k=request.top_k,
+            include_sources=request.include_sources
+        ),
+        media_type="text/event-stream"
+    )
+
+
 @router.post("/agent", response_model=AgentResponse)
 async def run_agent_workflow(request: AgentRequest):
     """
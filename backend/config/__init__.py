@@ -0,0 +1 @@
+from .settings import settings, Settings, get_settings
@@ -1,3 +1,4 @@
+from functools import lru_cache
 from pydantic import BaseSettings
 from typing import Optional
 
@@ -10,6 +11,7 @@ class Settings(BaseSettings):
     # Database settings
     database_url: str = "sqlite:///./multi_modal_content.db"
     vector_db_url: str = "http://localhost:8080"  # For Weaviate or similar
+    sqlite_read_pool_size: int = 8  # read-only connections alongside the single writer
     
     # API Keys and external services
     openai_api_key: Optional[str] = None
@@ -29,18 +31,44 @@ class Settings(BaseSettings):
     embedding_model: str = "llama-text-embed-v2"
     embedding_dimension: int = 1024
     embedding_provider: str = "llama"  # important
+    query_embedding_cache_size: int = 4096
+    embedding_batch_size: int = 100  # inputs per embeddings request (OpenAI allows up to 2048)
     
     # Pinecone settings
     pinecone_api_key: Optional[str] = None
     pinecone_environment: str = "us-west1-gcp-free"
     pinecone_index_name: str = "content-embeddings"
     pinecone_namespace: str = "multimodal-content"
+    pinecone_upsert_batch_size: int = 100
+    pinecone_pool_threads: int = 30
+    pinecone_use_grpc: bool = False  # requires pinecone-client[grpc]
+    pinecone_shards: int = 1  # namespaces vectors are sharded across by file_id
     
     # LLM settings
     default_llm_model: str = "gpt-4-turbo"  # or local model
+    llm_base_url: Optional[str] = None  # OpenAI-compatible server, e.g. a local vLLM
+    llm_cache_prompt: bool = False  # send cache_prompt to prefix-caching LLM servers
+    
+    # RAG settings
+    rag_concurrency: int = 16  # max concurrent queries in RAGPipeline.batch_query
+    context_token_budget: int = 1500  # max tokens of retrieved documents per prompt
+    rerank_enabled: bool = False  # cosine re-rank retrieved chunks against locally kept vectors
+    
+    # Query cache settings
+    query_cache_max_size: int = 2000
+    query_cache_ttl_seconds: int = 300
+    metadata_cache_max_size: int = 256
+    metadata_cache_ttl_seconds: int = 60
     
     class Config:
         env_file = ".env"
+        allow_mutation = False  # shared by every importer, so read-only
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Parse the environment and .env file once per process"""
+    return Settings()
 
 
-settings = Settings()
\ No newline at end of file
+settings = get_settings()
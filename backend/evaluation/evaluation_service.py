@@ -1,13 +1,11 @@
 import asyncio
 import logging
 from typing import List, Dict, Any, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 import re
 import json
 from collections import defaultdict
-from ..utils.embeddings import semantic_search
-from ..utils.llm_client import get_llm_response
-from ..services.pinecone_service import pinecone_service
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +13,8 @@ class EvaluationService:
     def __init__(self):
         self.metrics_log = []
         self.evaluation_history = []
+        # [health sum, alert sum, count] per UTC hour, keyed by 'YYYY-MM-DDTHH'
+        self.hourly_buckets = {}
         self.alert_thresholds = {
             'hallucination_score': 0.3,
             'low_precision': 0.5,
@@ -306,6 +306,12 @@ class EvaluationService:
             'alert_count': len(alerts)
         })
         
+        # Aggregate on write so trends never rescan the history
+        bucket = self.hourly_buckets.setdefault(timestamp[:13], [0.0, 0, 0])
+        bucket[0] += log_entry['overall_health']
+        bucket[1] += len(alerts)
+        bucket[2] += 1
+        
         # Persist to file (in production, this would go to a database)
         self._persist_metrics(log_entry)
         
@@ -319,6 +325,11 @@ class EvaluationService:
         """
         Evaluate the full RAG pipeline: query -> retrieval -> generation -> evaluation
         """
+        # Imported here: the retrieval and LLM stack (OpenAI, Pinecone) is only
+        # needed by this method, not by the metric-only evaluations
+        from ..utils.embeddings import semantic_search
+        from ..utils.llm_client import get_llm_response
+        
         # Step 1: Retrieve documents
         retrieved_docs = await semantic_search(query, top_k)
         
@@ -460,12 +471,15 @@ class EvaluationService:
             'metrics': averages,
             'health_summary': health_summary,
             'alert_summary': alert_summary,
-            'recent_evaluations': len([e for e in self.evaluation_history 
-                                     if datetime.fromisoformat(e['timestamp']) > 
-                                        datetime.utcnow().replace(tzinfo=None) - 
-                                        datetime.timedelta(hours=24)])
+            'recent_evaluations': int(np.count_nonzero(
+                self._history_timestamps() > np.datetime64(datetime.utcnow() - timedelta(hours=24))
+            ))
         }
     
+    def _history_timestamps(self) -> np.ndarray:
+        """Parse all evaluation history timestamps in one vectorized pass"""
+        return np.array([entry['timestamp'] for entry in self.evaluation_history], dtype='datetime64[us]')
+    
     def _get_most_common_items(self, items: List[str], n: int) -> List[Dict[str, Any]]:
         """Get most common items with counts"""
         from collections import Counter
@@ -474,35 +488,33 @@ class EvaluationService:
     
     def get_performance_trends(self, hours: int = 24) -> Dict[str, Any]:
         """Get performance trends over time"""
-        cutoff_time = datetime.utcnow().replace(tzinfo=None) - datetime.timedelta(hours=hours)
-        recent_evaluations = [
-            entry for entry in self.evaluation_history 
-            if datetime.fromisoformat(entry['timestamp']) > cutoff_time
-        ]
-        
-        if not recent_evaluations:
+        # Whole hours, from the one containing the cutoff onwards
+        cutoff_hour = (datetime.utcnow() - timedelta(hours=hours)).isoformat()[:13]
+        
+        # Group by hour of day
+        hourly_totals = defaultdict(lambda: [0.0, 0, 0])
+        for hour_start, (health_sum, alert_sum, count) in self.hourly_buckets.items():
+            if hour_start >= cutoff_hour:
+                totals = hourly_totals[int(hour_start[11:13])]
+                totals[0] += health_sum
+                totals[1] += alert_sum
+                totals[2] += count
+        
+        if not hourly_totals:
             return {'message': 'No recent evaluations found'}
         
-        # Group by hour
-        hourly_data = defaultdict(list)
-        for entry in recent_evaluations:
-            hour = datetime.fromisoformat(entry['timestamp']).hour
-            hourly_data[hour].append(entry)
-        
         trends = {}
-        for hour, entries in hourly_data.items():
-            avg_health = sum(e['health_score'] for e in entries) / len(entries)
-            avg_alerts = sum(e['alert_count'] for e in entries) / len(entries)
+        for hour, (health_sum, alert_sum, count) in hourly_totals.items():
             trends[hour] = {
-                'average_health': avg_health,
-                'average_alerts': avg_alerts,
-                'evaluation_count': len(entries)
+                'average_health': health_sum / count,
+                'average_alerts': alert_sum / count,
+                'evaluation_count': count
             }
         
         return {
             'timeframe_hours': hours,
             'hourly_trends': dict(sorted(trends.items())),
-            'total_evaluations': len(recent_evaluations)
+            'total_evaluations': sum(count for _, _, count in hourly_totals.values())
         }
 
 # Global evaluation service instance
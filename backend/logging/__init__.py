@@ -1,10 +1,11 @@
-import json
 import logging
 import logging.config
 from datetime import datetime
 from typing import Dict, Any, Optional
 import os
+from functools import lru_cache
 from pathlib import Path
+import orjson
 
 class JSONFormatter(logging.Formatter):
     """Custom JSON formatter for structured logging"""
@@ -33,7 +34,7 @@ class JSONFormatter(logging.Formatter):
                           'exc_text', 'stack_info']:
                 log_entry[key] = value
         
-        return json.dumps(log_entry, default=str)
+        return orjson.dumps(log_entry, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
 
 
 def setup_logging(log_level: str = "INFO", log_file: Optional[str] = None):
@@ -101,8 +102,12 @@ def setup_logging(log_level: str = "INFO", log_file: Optional[str] = None):
     logging.getLogger("PIL").setLevel(logging.WARNING)
 
 
+@lru_cache(maxsize=256)
 def get_logger(name: str) -> logging.Logger:
-    """Get a logger instance with the specified name"""
+    """
+    Get a logger instance with the specified name; cached, since the log_*
+    helpers look theirs up on every call and the logging registry takes a lock
+    """
     return logging.getLogger(name)
 
 
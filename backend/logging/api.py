@@ -1,5 +1,6 @@
-from fastapi import APIRouter, HTTPException
-from typing import Dict, Any
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from typing import Dict, Any, Optional
+from datetime import datetime
 import logging
 
 from .metrics import metrics_tracker
@@ -20,16 +21,36 @@ async def get_metrics():
         raise HTTPException(status_code=500, detail=f"Getting metrics failed: {str(e)}")
 
 @router.get("/logging/metrics/history")
-async def get_metrics_history():
+async def get_metrics_history(limit: Optional[int] = Query(None, ge=1)):
     """
-    Get recent metrics history
+    Get recent metrics history, optionally only the last `limit` entries
     """
     try:
-        return {"history": metrics_tracker.metrics['request_history']}
+        return {"history": metrics_tracker.get_request_history(limit)}
     except Exception as e:
         logger.error(f"Error getting metrics history: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Getting metrics history failed: {str(e)}")
 
+@router.get("/logging/metrics/bundle")
+async def get_metrics_bundle(request: Request, response: Response, history_limit: int = Query(50, ge=1)):
+    """
+    Get the metrics summary, recent history and health status in one response;
+    answers 304 Not Modified when the client's ETag is still current
+    """
+    try:
+        etag = f'"{metrics_tracker.revision}-{history_limit}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        return {
+            "metrics": metrics_tracker.get_metrics_summary(),
+            "history": metrics_tracker.get_request_history(history_limit),
+            "healthy": True
+        }
+    except Exception as e:
+        logger.error(f"Error getting metrics bundle: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Getting metrics bundle failed: {str(e)}")
+
 @router.get("/logging/health")
 async def health_check():
     """
@@ -107,26 +128,7 @@ async def reset_metrics():
     """
     try:
         # Reset metrics to initial state
-        metrics_tracker.metrics = {
-            'queries_processed': 0,
-            'total_response_time': 0.0,
-            'query_count': 0,
-            'rag_retrieval_count': 0,
-            'file_upload_count': 0,
-            'agent_workflow_count': 0,
-            'error_count': 0,
-            'api_request_count': 0,
-            'successful_requests': 0,
-            'failed_requests': 0,
-            'total_processing_time': 0.0,
-            'peak_concurrent_users': 0,
-            'active_users': set(),
-            'request_history': [],
-            'response_times': [],
-            'error_types': {},
-            'endpoint_metrics': {}
-        }
-        metrics_tracker._save_metrics()
+        metrics_tracker.reset()
         return {"status": "success", "message": "Metrics reset successfully"}
     except Exception as e:
         logger.error(f"Error resetting metrics: {str(e)}")
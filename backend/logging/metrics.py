@@ -1,8 +1,14 @@
 import asyncio
+import atexit
+import os
+import threading
 import time
 from datetime import datetime
-from typing import Dict, Any, List
-import json
+from typing import Dict, Any, Iterable, List, Optional
+from collections import Counter, deque
+from itertools import islice
+import numpy as np
+import orjson
 from pathlib import Path
 import logging
 
@@ -10,6 +16,53 @@ from . import get_logger
 
 logger = get_logger(__name__)
 
+# Bounded windows; the deques evict their oldest entries on append
+HISTORY_SIZE = 100
+RESPONSE_TIMES_SIZE = 1000
+
+# Bursts of changes are coalesced into at most one metrics file write per
+# interval (seconds); a trailing write picks up the last changes
+SAVE_INTERVAL = float(os.getenv("METRICS_SAVE_INTERVAL", "1.0"))
+
+# Event types accepted by log_events, each handled by the matching log_* method
+EVENT_TYPES = frozenset({'query', 'rag_retrieval', 'file_upload', 'agent_workflow', 'error', 'api_request'})
+
+# Reported response time percentiles, as fractions of the sorted window
+PERCENTILES = np.array([0.5, 0.9, 0.95, 0.99])
+
+
+def _select_percentiles(times: np.ndarray, quantiles: np.ndarray) -> np.ndarray:
+    """
+    sorted(times)[int(n * q)] for each quantile, found by partial selection
+    (O(n) per quantile) instead of a full sort
+    """
+    n = len(times)
+    selected = np.empty(len(quantiles))
+    work = times.copy()
+    for i in range(len(quantiles)):
+        k = int(n * quantiles[i])
+        work = np.partition(work, k)
+        selected[i] = work[k]
+    return selected
+
+
+# _select_percentiles, JIT-compiled on first use: importing Numba takes longer
+# than the rest of this module's imports together
+_percentile_kernel = None
+
+
+def _get_percentile_kernel():
+    global _percentile_kernel
+    if _percentile_kernel is None:
+        try:
+            from numba import njit
+            _percentile_kernel = njit(cache=True)(_select_percentiles)
+        except ImportError:
+            # Without Numba the percentile selection runs on plain NumPy
+            _percentile_kernel = _select_percentiles
+    return _percentile_kernel
+
+
 class MetricsTracker:
     """Service to track and store application metrics"""
     
@@ -18,7 +71,45 @@ class MetricsTracker:
         self.metrics_file.parent.mkdir(exist_ok=True)
         
         # Initialize metrics storage with enhanced metrics
-        self.metrics = {
+        self.metrics = self._default_metrics()
+        
+        # Bumped on every change; get_metrics_summary is cached against it
+        self._revision = 0
+        self._started = int(time.time() * 1000)
+        self._summary_cache = None
+        self._summary_revision = -1
+        
+        # Pending coalesced write, if any
+        self._save_lock = threading.Lock()
+        self._save_timer: Optional[threading.Timer] = None
+        self._last_save = 0.0
+        self._dirty = False
+        self._batching = False
+        atexit.register(self.flush)
+        
+        # Load existing metrics if file exists
+        if self.metrics_file.exists():
+            try:
+                with open(self.metrics_file, 'rb') as f:
+                    loaded_metrics = orjson.loads(f.read())
+                    # Merge loaded metrics with defaults
+                    self.metrics.update(loaded_metrics)
+                    # Ensure active_users is a set and the windows are bounded deques
+                    if 'active_users' in self.metrics:
+                        self.metrics['active_users'] = set(self.metrics['active_users'])
+                    self.metrics['request_history'] = deque(self.metrics['request_history'], maxlen=HISTORY_SIZE)
+                    self.metrics['response_times'] = deque(self.metrics['response_times'], maxlen=RESPONSE_TIMES_SIZE)
+                    # Files written before activity counts were tracked
+                    if 'activity_counts' not in loaded_metrics:
+                        self.metrics['activity_counts'] = dict(Counter(
+                            entry['type'] for entry in self.metrics['request_history']
+                        ))
+            except Exception as e:
+                logger.warning(f"Could not load metrics file: {e}")
+    
+    @staticmethod
+    def _default_metrics() -> Dict[str, Any]:
+        return {
             'queries_processed': 0,
             'total_response_time': 0.0,
             'query_count': 0,
@@ -32,24 +123,41 @@ class MetricsTracker:
             'total_processing_time': 0.0,
             'peak_concurrent_users': 0,
             'active_users': set(),
-            'request_history': [],
-            'response_times': [],  # Store last 1000 response times for percentiles
+            'request_history': deque(maxlen=HISTORY_SIZE),
+            'response_times': deque(maxlen=RESPONSE_TIMES_SIZE),  # Last 1000, for percentiles
             'error_types': {},     # Track error type frequencies
-            'endpoint_metrics': {} # Track per-endpoint metrics
+            'activity_counts': {}, # Entry counts by type over request_history
+            'endpoint_metrics': {}, # Track per-endpoint metrics
+            'query_cache_hits': 0,
+            'query_cache_misses': 0
         }
-        
-        # Load existing metrics if file exists
-        if self.metrics_file.exists():
-            try:
-                with open(self.metrics_file, 'r') as f:
-                    loaded_metrics = json.load(f)
-                    # Merge loaded metrics with defaults
-                    self.metrics.update(loaded_metrics)
-                    # Ensure active_users is a set
-                    if 'active_users' in self.metrics:
-                        self.metrics['active_users'] = set(self.metrics['active_users'])
-            except Exception as e:
-                logger.warning(f"Could not load metrics file: {e}")
+    
+    @property
+    def revision(self) -> str:
+        """Opaque token that changes whenever the metrics do (and across restarts)"""
+        return f"{self._started}-{self._revision}"
+    
+    def reset(self):
+        """Reset all metrics to their initial state and persist them"""
+        self.metrics = self._default_metrics()
+        self._save_metrics()
+    
+    def log_events(self, events: Iterable[Dict[str, Any]]):
+        """
+        Log several events with one save; each event is a dict of a 'type' from
+        EVENT_TYPES plus the keyword arguments of the matching log_* method
+        """
+        self._batching = True
+        try:
+            for event in events:
+                arguments = dict(event)
+                event_type = arguments.pop('type')
+                if event_type not in EVENT_TYPES:
+                    raise ValueError(f"Unknown metrics event type: {event_type}")
+                getattr(self, f"log_{event_type}")(**arguments)
+        finally:
+            self._batching = False
+            self._save_metrics()
     
     def log_query(self, query: str, response_time: float, sources: List[Dict[str, Any]] = None, user_id: str = None):
         """Log a query with its response time"""
@@ -59,16 +167,13 @@ class MetricsTracker:
         
         # Track response times for percentile calculations
         self.metrics['response_times'].append(response_time)
-        if len(self.metrics['response_times']) > 1000:
-            self.metrics['response_times'] = self.metrics['response_times'][-1000:]
         
         # Track active users
         if user_id:
             self.metrics['active_users'].add(user_id)
             self._update_peak_concurrent_users()
         
-        # Add to request history (keep last 100 entries)
-        self.metrics['request_history'].append({
+        self._append_history({
             'timestamp': datetime.utcnow().isoformat(),
             'type': 'query',
             'query': query[:100] + '...' if len(query) > 100 else query,
@@ -77,10 +182,6 @@ class MetricsTracker:
             'user_id': user_id
         })
         
-        # Keep only last 100 entries
-        if len(self.metrics['request_history']) > 100:
-            self.metrics['request_history'] = self.metrics['request_history'][-100:]
-        
         self._save_metrics()
     
     def log_rag_retrieval(self, query: str, results_count: int, retrieval_time: float = None, user_id: str = None):
@@ -96,7 +197,7 @@ class MetricsTracker:
             self.metrics['active_users'].add(user_id)
             self._update_peak_concurrent_users()
         
-        self.metrics['request_history'].append({
+        self._append_history({
             'timestamp': datetime.utcnow().isoformat(),
             'type': 'rag_retrieval',
             'query': query[:100] + '...' if len(query) > 100 else query,
@@ -105,10 +206,6 @@ class MetricsTracker:
             'user_id': user_id
         })
         
-        # Keep only last 100 entries
-        if len(self.metrics['request_history']) > 100:
-            self.metrics['request_history'] = self.metrics['request_history'][-100:]
-        
         self._save_metrics()
     
     def log_file_upload(self, filename: str, file_size: int, content_type: str, upload_time: float = None, user_id: str = None):
@@ -124,7 +221,7 @@ class MetricsTracker:
             self.metrics['active_users'].add(user_id)
             self._update_peak_concurrent_users()
         
-        self.metrics['request_history'].append({
+        self._append_history({
             'timestamp': datetime.utcnow().isoformat(),
             'type': 'file_upload',
             'filename': filename,
@@ -134,10 +231,6 @@ class MetricsTracker:
             'user_id': user_id
         })
         
-        # Keep only last 100 entries
-        if len(self.metrics['request_history']) > 100:
-            self.metrics['request_history'] = self.metrics['request_history'][-100:]
-        
         self._save_metrics()
     
     def log_agent_workflow(self, workflow_id: str, steps_completed: int, execution_time: float, status: str = "completed", user_id: str = None):
@@ -152,7 +245,7 @@ class MetricsTracker:
             self.metrics['active_users'].add(user_id)
             self._update_peak_concurrent_users()
         
-        self.metrics['request_history'].append({
+        self._append_history({
             'timestamp': datetime.utcnow().isoformat(),
             'type': 'agent_workflow',
             'workflow_id': workflow_id,
@@ -162,10 +255,6 @@ class MetricsTracker:
             'user_id': user_id
         })
         
-        # Keep only last 100 entries
-        if len(self.metrics['request_history']) > 100:
-            self.metrics['request_history'] = self.metrics['request_history'][-100:]
-        
         self._save_metrics()
     
     def log_error(self, error_type: str, error_message: str, context: Dict[str, Any] = None, user_id: str = None):
@@ -179,7 +268,7 @@ class MetricsTracker:
         else:
             self.metrics['error_types'][error_type] = 1
         
-        self.metrics['request_history'].append({
+        self._append_history({
             'timestamp': datetime.utcnow().isoformat(),
             'type': 'error',
             'error_type': error_type,
@@ -188,10 +277,6 @@ class MetricsTracker:
             'user_id': user_id
         })
         
-        # Keep only last 100 entries
-        if len(self.metrics['request_history']) > 100:
-            self.metrics['request_history'] = self.metrics['request_history'][-100:]
-        
         self._save_metrics()
     
     def log_api_request(self, method: str, endpoint: str, status_code: int, response_time: float, user_id: str = None):
@@ -239,7 +324,7 @@ class MetricsTracker:
             self.metrics['active_users'].add(user_id)
             self._update_peak_concurrent_users()
         
-        self.metrics['request_history'].append({
+        self._append_history({
             'timestamp': datetime.utcnow().isoformat(),
             'type': 'api_request',
             'method': method,
@@ -249,18 +334,42 @@ class MetricsTracker:
             'user_id': user_id
         })
         
-        # Keep only last 100 entries
-        if len(self.metrics['request_history']) > 100:
-            self.metrics['request_history'] = self.metrics['request_history'][-100:]
-        
         self._save_metrics()
     
+    def _append_history(self, entry: Dict[str, Any]):
+        """Add to request history (keep last 100 entries), keeping activity counts in step"""
+        history = self.metrics['request_history']
+        counts = self.metrics['activity_counts']
+        if len(history) == history.maxlen:
+            # The append below evicts the oldest entry
+            evicted = history[0]['type']
+            counts[evicted] -= 1
+            if not counts[evicted]:
+                del counts[evicted]
+        history.append(entry)
+        counts[entry['type']] = counts.get(entry['type'], 0) + 1
+    
+    def log_query_cache_lookup(self, hit: bool):
+        """Count a query cache hit or miss (persisted with the next save)"""
+        if hit:
+            self.metrics['query_cache_hits'] += 1
+        else:
+            self.metrics['query_cache_misses'] += 1
+        self._revision += 1
+    
     def _update_peak_concurrent_users(self):
         """Update peak concurrent users count"""
         current_active = len(self.metrics['active_users'])
         if current_active > self.metrics['peak_concurrent_users']:
             self.metrics['peak_concurrent_users'] = current_active
     
+    def get_request_history(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get the most recent request history entries, oldest first"""
+        history = self.metrics['request_history']
+        if limit is None or limit >= len(history):
+            return list(history)
+        return list(islice(history, len(history) - limit, None))
+    
     def get_average_response_time(self) -> float:
         """Get the average response time for queries"""
         if self.metrics['query_count'] == 0:
@@ -272,18 +381,19 @@ class MetricsTracker:
         if not self.metrics['response_times']:
             return {'p50': 0.0, 'p90': 0.0, 'p95': 0.0, 'p99': 0.0}
         
-        sorted_times = sorted(self.metrics['response_times'])
-        n = len(sorted_times)
+        times = np.fromiter(self.metrics['response_times'], dtype=np.float64)
+        p50, p90, p95, p99 = _get_percentile_kernel()(times, PERCENTILES).tolist()
         
-        return {
-            'p50': sorted_times[int(n * 0.5)],
-            'p90': sorted_times[int(n * 0.9)],
-            'p95': sorted_times[int(n * 0.95)],
-            'p99': sorted_times[int(n * 0.99)]
-        }
+        return {'p50': p50, 'p90': p90, 'p95': p95, 'p99': p99}
     
     def get_metrics_summary(self) -> Dict[str, Any]:
-        """Get a comprehensive summary of all metrics"""
+        """Get a comprehensive summary of all metrics, recomputed only after changes"""
+        if self._summary_revision != self._revision:
+            self._summary_cache = self._build_metrics_summary()
+            self._summary_revision = self._revision
+        return self._summary_cache
+    
+    def _build_metrics_summary(self) -> Dict[str, Any]:
         avg_response_time = self.get_average_response_time()
         percentiles = self.get_response_time_percentiles()
         
@@ -315,21 +425,52 @@ class MetricsTracker:
             'peak_concurrent_users': self.metrics['peak_concurrent_users'],
             'total_processing_time': round(self.metrics['total_processing_time'], 3),
             'error_types': self.metrics['error_types'],
-            'endpoint_metrics': self.metrics['endpoint_metrics']
+            'activity_counts': self.metrics['activity_counts'],
+            'endpoint_metrics': self.metrics['endpoint_metrics'],
+            'query_cache_hits': self.metrics['query_cache_hits'],
+            'query_cache_misses': self.metrics['query_cache_misses']
         }
     
     def _save_metrics(self):
-        """Save metrics to file"""
-        try:
-            # Convert set to list for JSON serialization
-            metrics_to_save = self.metrics.copy()
-            if 'active_users' in metrics_to_save:
-                metrics_to_save['active_users'] = list(metrics_to_save['active_users'])
-            
-            with open(self.metrics_file, 'w') as f:
-                json.dump(metrics_to_save, f, indent=2, default=str)
-        except Exception as e:
-            logger.error(f"Could not save metrics file: {e}")
+        """Save metrics to file, at most once per SAVE_INTERVAL"""
+        if self._batching:
+            # log_events saves once at the end of the batch
+            return
+        self._revision += 1
+        with self._save_lock:
+            self._dirty = True
+            if self._save_timer is not None:
+                # The pending write will include this change
+                return
+            delay = self._last_save + SAVE_INTERVAL - time.monotonic()
+            if delay > 0:
+                self._save_timer = threading.Timer(delay, self.flush)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+                return
+        self.flush()
+    
+    def flush(self):
+        """Write pending metrics changes to file now"""
+        with self._save_lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if not self._dirty:
+                return
+            self._dirty = False
+            self._last_save = time.monotonic()
+            try:
+                # Convert set and deques to lists for JSON serialization
+                metrics_to_save = self.metrics.copy()
+                for key in ('active_users', 'request_history', 'response_times'):
+                    if key in metrics_to_save:
+                        metrics_to_save[key] = list(metrics_to_save[key])
+                
+                with open(self.metrics_file, 'wb') as f:
+                    f.write(orjson.dumps(metrics_to_save, default=str, option=orjson.OPT_NON_STR_KEYS))
+            except Exception as e:
+                logger.error(f"Could not save metrics file: {e}")
 
 # Global metrics tracker instance
 metrics_tracker = MetricsTracker()
\ No newline at end of file
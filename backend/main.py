@@ -7,6 +7,8 @@ from api.agent_routes import router as agent_router
 from evaluation.api import router as evaluation_router
 # from logging.api import router as logging_router  # Disabled due to import conflict
 from config import settings
+from utils.llm_client import close_client
+from utils.database import init_db, close_db
 
 app = FastAPI(
     title="Multi-Modal Content Analytics API",
@@ -31,6 +33,15 @@ app.include_router(agent_router, prefix="/api/v1")
 app.include_router(evaluation_router, prefix="/api/v1")
 # app.include_router(logging_router, prefix="/api/v1")  # Disabled due to import conflict
 
+@app.on_event("startup")
+async def startup():
+    await init_db()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await close_client()
+    await close_db()
+
 @app.get("/")
 async def root():
     return {"message": "Multi-Modal Content Analytics API is running!"}
@@ -50,10 +50,10 @@ class ContentMetadata(BaseModel):
     file_id: str
     filename: str
     content_type: ContentType
-    size: int
+    size: int = 0
     upload_time: datetime
-    processing_status: ProcessingStatus
-    tags: List[str]
+    processing_status: ProcessingStatus = ProcessingStatus.PENDING
+    tags: List[str] = []
 
 class SearchResult(BaseModel):
     file_id: str
@@ -1,9 +1,9 @@
 import asyncio
 from typing import Dict, Any, List, Optional
-from datetime import datetime
 import logging
 
 from .agent_orchestrator import AgentStep, AgentStepType
+from ..utils.timestamps import utc_now
 
 logger = logging.getLogger(__name__)
 
@@ -13,14 +13,14 @@ class Agent:
         self.name = name
         self.description = description
         self.capabilities = capabilities
-        self.created_at = datetime.utcnow()
+        self.created_at = utc_now()
         self.status = "active"
         self.task_queue = []
         self.is_running = False
         
     async def execute_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
         """Execute a single task"""
-        task_id = task.get('task_id', f"task_{datetime.utcnow().timestamp()}")
+        task_id = task.get('task_id', f"task_{utc_now().timestamp()}")
         query = task.get('query', '')
         task_type = task.get('type', 'general')
         
@@ -44,7 +44,7 @@ class Agent:
                 'task_id': task_id,
                 'status': 'completed',
                 'result': result,
-                'timestamp': datetime.utcnow().isoformat()
+                'timestamp': utc_now().isoformat()
             }
             
         except Exception as e:
@@ -53,7 +53,7 @@ class Agent:
                 'task_id': task_id,
                 'status': 'failed',
                 'error': str(e),
-                'timestamp': datetime.utcnow().isoformat()
+                'timestamp': utc_now().isoformat()
             }
     
     async def _create_research_workflow(self, query: str) -> List[AgentStep]:
@@ -106,7 +106,7 @@ class Agent:
                 step_type=AgentStepType.ANALYSIS,
                 description="Perform detailed analysis of the collected data",
                 parameters={
-                    'prompt': f'Perform a detailed analysis of the following data in the context of: {query}'
+                    'prompt': f'Perform a detailed analysis of the following data.\n\nUser query: {query}'
                 },
                 dependencies=["data_collection_step_1"]
             ),
@@ -203,7 +203,7 @@ class Agent:
         from .agent_orchestrator import agent_orchestrator
         
         # Register the workflow temporarily
-        workflow_id = f"temp_workflow_{datetime.utcnow().timestamp()}"
+        workflow_id = f"temp_workflow_{utc_now().timestamp()}"
         await agent_orchestrator.register_workflow(workflow_id, steps)
         
         try:
@@ -212,8 +212,7 @@ class Agent:
             return result
         finally:
             # Clean up the temporary workflow
-            if workflow_id in agent_orchestrator.workflows:
-                del agent_orchestrator.workflows[workflow_id]
+            agent_orchestrator.unregister_workflow(workflow_id)
     
     async def add_to_queue(self, task: Dict[str, Any]):
         """Add a task to the agent's queue"""
@@ -1,10 +1,10 @@
 import asyncio
 import json
-from typing import Dict, Any, List, Optional, Callable
-from datetime import datetime
+from typing import Dict, Any, List, Optional, Callable, Set, Tuple
 import logging
 from enum import Enum
 import time
+from types import MappingProxyType
 
 from ..logging import get_logger
 from ..logging.metrics import metrics_tracker
@@ -14,11 +14,10 @@ logger = get_logger(__name__)
 from ..config import settings
 from ..utils.llm_client import get_llm_response
 from ..utils.embeddings import semantic_search
+from ..utils.timestamps import WorkflowClock
 from ..services.pinecone_service import pinecone_service
 from ..services.blip2_service import blip2_service
 
-logger = logging.getLogger(__name__)
-
 class AgentStepType(Enum):
     RESEARCH = "research"
     ANALYSIS = "analysis"
@@ -30,6 +29,11 @@ class AgentStepType(Enum):
     SUMMARIZATION = "summarization"
 
 class AgentStep:
+    __slots__ = (
+        "step_id", "step_type", "description", "parameters", "dependencies",
+        "status", "result", "error", "execution_time"
+    )
+    
     def __init__(
         self, 
         step_id: str, 
@@ -51,7 +55,8 @@ class AgentStep:
 class AgentOrchestrator:
     def __init__(self):
         self.agents: Dict[str, 'Agent'] = {}
-        self.workflows: Dict[str, List[AgentStep]] = {}
+        self.workflows: Dict[str, Tuple[AgentStep, ...]] = {}
+        self._workflow_meta: Dict[str, Dict[str, Any]] = {}
         self.results: Dict[str, Any] = {}
         
     async def create_agent(
@@ -72,9 +77,58 @@ class AgentOrchestrator:
         steps: List[AgentStep]
     ):
         """Register a multi-step workflow"""
+        steps = tuple(steps)
+        self._workflow_meta[workflow_id] = self._build_workflow_meta(workflow_id, steps)
         self.workflows[workflow_id] = steps
         return True
     
+    def unregister_workflow(self, workflow_id: str):
+        """Remove a registered workflow and its dependency indices"""
+        self.workflows.pop(workflow_id, None)
+        self._workflow_meta.pop(workflow_id, None)
+    
+    def _build_workflow_meta(self, workflow_id: str, steps: Tuple[AgentStep, ...]) -> Dict[str, Any]:
+        """Index steps by id and dependency once, rejecting duplicate ids and cycles.
+        
+        Dependencies on step ids outside the workflow are treated as satisfied.
+        """
+        by_id = {}
+        for step in steps:
+            if step.step_id in by_id:
+                raise ValueError(f"Workflow {workflow_id} has duplicate step id: {step.step_id}")
+            by_id[step.step_id] = step
+        
+        dependents = {step.step_id: [] for step in steps}
+        in_degree = {}
+        for step in steps:
+            internal = [dep for dep in step.dependencies if dep in by_id]
+            in_degree[step.step_id] = len(internal)
+            for dep in internal:
+                dependents[dep].append(step.step_id)
+        
+        # Kahn's algorithm: any step never reaching in-degree 0 sits on a cycle
+        remaining = dict(in_degree)
+        frontier = [step_id for step_id, degree in remaining.items() if degree == 0]
+        visited = 0
+        while frontier:
+            step_id = frontier.pop()
+            visited += 1
+            for dependent_id in dependents[step_id]:
+                remaining[dependent_id] -= 1
+                if remaining[dependent_id] == 0:
+                    frontier.append(dependent_id)
+        if visited != len(steps):
+            raise ValueError(f"Workflow {workflow_id} contains a dependency cycle")
+        
+        return {
+            'by_id': MappingProxyType(by_id),
+            'dependents': MappingProxyType({
+                step_id: tuple(ids) for step_id, ids in dependents.items()
+            }),
+            'in_degree': MappingProxyType(in_degree),
+            'roots': tuple(step.step_id for step in steps if in_degree[step.step_id] == 0)
+        }
+    
     async def execute_workflow(
         self, 
         workflow_id: str, 
@@ -89,116 +143,236 @@ class AgentOrchestrator:
             logger.error(error_msg)
             raise ValueError(error_msg)
         
-        logger.info(
-            f"Starting execution of workflow: {workflow_id}",
-            extra={
-                "workflow_id": workflow_id,
-                "initial_context_keys": list(initial_context.keys())
-            }
-        )
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Starting execution of workflow: %s", workflow_id,
+                extra={
+                    "workflow_id": workflow_id,
+                    "initial_context_keys": list(initial_context.keys())
+                }
+            )
         
         workflow = self.workflows[workflow_id]
+        meta = self._workflow_meta[workflow_id]
+        by_id = meta['by_id']
+        dependents = meta['dependents']
         context = initial_context.copy()
         execution_results = []
+        clock = WorkflowClock()
         
-        step_count = 0
+        if max_steps >= len(workflow):
+            in_degree = dict(meta['in_degree'])
+        else:
+            # Dependencies cut off by max_steps are treated as satisfied
+            selected = {step.step_id for step in workflow[:max_steps]}
+            in_degree = {
+                step_id: sum(1 for dep in by_id[step_id].dependencies if dep in selected)
+                for step_id in selected
+            }
         
-        for step in workflow[:max_steps]:
-            step_start_time = time.time()
-            logger.info(f"Executing step: {step.step_id} ({step.step_type.value})")
-            
-            try:
-                # Execute the step
-                step_result = await self._execute_step(step, context)
-                
-                # Update context with step result
-                context[step.step_id] = step_result
-                execution_results.append({
-                    'step_id': step.step_id,
-                    'result': step_result,
-                    'timestamp': datetime.utcnow().isoformat()
-                })
-                
-                step.status = "completed"
-                step.result = step_result
-                step_count += 1
-                
-                step_execution_time = time.time() - step_start_time
-                logger.info(
-                    f"Step {step.step_id} completed",
-                    extra={
-                        "step_id": step.step_id,
-                        "step_type": step.step_type.value,
-                        "execution_time": step_execution_time
-                    }
-                )
-                
-            except Exception as e:
-                step_execution_time = time.time() - step_start_time
-                logger.error(f"Error executing step {step.step_id}: {str(e)}")
-                step.status = "failed"
-                step.error = str(e)
-                execution_results.append({
-                    'step_id': step.step_id,
-                    'error': str(e),
-                    'timestamp': datetime.utcnow().isoformat()
-                })
-                
-                # Log the error
-                logger.error(
-                    f"Agent workflow step failed: {str(e)}",
-                    extra={
-                        "workflow_id": workflow_id,
-                        "step_id": step.step_id,
-                        "step_type": step.step_type.value,
-                        "execution_time": step_execution_time,
-                        "error_type": type(e).__name__
-                    },
-                    exc_info=True
+        completed_ids = set()
+        skipped_ids = set()
+        ready = [step for step in workflow if in_degree.get(step.step_id) == 0]
+        
+        try:
+            while ready:
+                # Completed steps are added to completed_ids as they finish, so
+                # the failure metric counts them even if the wave raises
+                succeeded, failed = await self._execute_wave(
+                    workflow_id, ready, context, execution_results, clock, completed_ids
                 )
                 
-                # Track the error in metrics
-                metrics_tracker.log_error(
-                    error_type=type(e).__name__,
-                    error_message=str(e),
-                    context={
-                        "workflow_id": workflow_id,
-                        "step_id": step.step_id,
-                        "step_type": step.step_type.value
-                    }
-                )
+                # Dependents of a failed step are pruned rather than executed
+                # against a context that is missing their inputs
+                to_skip = [dep_id for step_id in failed for dep_id in dependents[step_id]]
+                while to_skip:
+                    step_id = to_skip.pop()
+                    if step_id in skipped_ids or step_id not in in_degree:
+                        continue
+                    skipped_ids.add(step_id)
+                    self._skip_step(by_id[step_id], "dependency failed", execution_results, clock)
+                    to_skip.extend(dependents[step_id])
                 
-                # Optionally continue or fail fast based on configuration
-                # For now, we'll continue execution
-                continue
+                ready = []
+                for step_id in succeeded:
+                    for dependent_id in dependents[step_id]:
+                        if dependent_id not in in_degree or dependent_id in skipped_ids:
+                            continue
+                        in_degree[dependent_id] -= 1
+                        if in_degree[dependent_id] == 0:
+                            ready.append(by_id[dependent_id])
+        except Exception:
+            execution_time = time.time() - start_time
+            metrics_tracker.log_agent_workflow(
+                workflow_id, len(completed_ids), execution_time, status="failed"
+            )
+            raise
         
+        step_count = len(completed_ids)
         execution_time = time.time() - start_time
         
         # Log the agent workflow execution
         metrics_tracker.log_agent_workflow(workflow_id, step_count, execution_time)
         
-        logger.info(
-            f"Workflow {workflow_id} execution completed",
-            extra={
-                "workflow_id": workflow_id,
-                "steps_completed": step_count,
-                "execution_time": execution_time,
-                "status": "completed"
-            }
-        )
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Workflow %s execution completed", workflow_id,
+                extra={
+                    "workflow_id": workflow_id,
+                    "steps_completed": step_count,
+                    "execution_time": execution_time,
+                    "status": "completed"
+                }
+            )
         
         return {
             'workflow_id': workflow_id,
             'status': 'completed',
-            'results': execution_results,
+            'results': clock.stamp(execution_results),
             'final_context': context,
-            'timestamp': datetime.utcnow().isoformat(),
+            'timestamp': clock.isoformat(),
             'execution_time': execution_time
         }
     
+    async def _execute_wave(
+        self,
+        workflow_id: str,
+        steps: List[AgentStep],
+        context: Dict[str, Any],
+        execution_results: List[Dict[str, Any]],
+        clock: WorkflowClock,
+        completed_ids: Set[str]
+    ) -> Tuple[List[str], List[str]]:
+        """Execute a group of independent steps concurrently.
+        
+        A failing step marked ``critical`` cancels the rest of the wave and
+        re-raises; other failures are recorded so their dependents get pruned.
+        Succeeded steps are also added to completed_ids as they finish.
+        """
+        tasks = {
+            asyncio.ensure_future(self._execute_step(step, context)): step
+            for step in steps
+        }
+        succeeded = []
+        failed = []
+        remaining = set(tasks)
+        
+        try:
+            while remaining:
+                done, remaining = await asyncio.wait(
+                    remaining, return_when=asyncio.FIRST_EXCEPTION
+                )
+                # Every finished task is recorded (and its exception retrieved)
+                # before a critical failure is re-raised
+                critical_error = None
+                for task in done:
+                    step = tasks[task]
+                    error = task.exception()
+                    if error is None:
+                        step_result = task.result()
+                        
+                        # Update context with step result
+                        context[step.step_id] = step_result
+                        execution_results.append({
+                            'step_id': step.step_id,
+                            'result': step_result,
+                            't_offset_us': clock.offset_us()
+                        })
+                        
+                        step.status = "completed"
+                        step.result = step_result
+                        succeeded.append(step.step_id)
+                        completed_ids.add(step.step_id)
+                        
+                        if logger.isEnabledFor(logging.INFO):
+                            logger.info(
+                                "Step %s (%s) finished in %.3fs",
+                                step.step_id, step.step_type.value, step.execution_time,
+                                extra={
+                                    "step_id": step.step_id,
+                                    "step_type": step.step_type.value,
+                                    "execution_time": step.execution_time
+                                }
+                            )
+                        continue
+                    
+                    self._record_step_failure(workflow_id, step, error, execution_results, clock)
+                    failed.append(step.step_id)
+                    
+                    if step.parameters.get('critical', False) and critical_error is None:
+                        critical_error = error
+                
+                if critical_error is not None:
+                    raise critical_error
+        finally:
+            for task in remaining:
+                task.cancel()
+            if remaining:
+                await asyncio.gather(*remaining, return_exceptions=True)
+        
+        return succeeded, failed
+    
+    def _record_step_failure(
+        self,
+        workflow_id: str,
+        step: AgentStep,
+        error: BaseException,
+        execution_results: List[Dict[str, Any]],
+        clock: WorkflowClock
+    ):
+        """Record a failed step in the results, logs and metrics"""
+        step.status = "failed"
+        step.error = str(error)
+        execution_results.append({
+            'step_id': step.step_id,
+            'error': str(error),
+            't_offset_us': clock.offset_us()
+        })
+        
+        # Log the error
+        logger.error(
+            "Agent workflow step failed: %s", error,
+            extra={
+                "workflow_id": workflow_id,
+                "step_id": step.step_id,
+                "step_type": step.step_type.value,
+                "execution_time": step.execution_time,
+                "error_type": type(error).__name__
+            },
+            exc_info=error
+        )
+        
+        # Track the error in metrics
+        metrics_tracker.log_error(
+            error_type=type(error).__name__,
+            error_message=str(error),
+            context={
+                "workflow_id": workflow_id,
+                "step_id": step.step_id,
+                "step_type": step.step_type.value
+            }
+        )
+    
+    def _skip_step(
+        self,
+        step: AgentStep,
+        reason: str,
+        execution_results: List[Dict[str, Any]],
+        clock: WorkflowClock
+    ):
+        """Mark a step as skipped without executing it"""
+        logger.warning("Skipping step %s: %s", step.step_id, reason)
+        step.status = "skipped"
+        execution_results.append({
+            'step_id': step.step_id,
+            'status': 'skipped',
+            'reason': reason,
+            't_offset_us': clock.offset_us()
+        })
+    
     async def _execute_step(self, step: AgentStep, context: Dict[str, Any]) -> Any:
         """Execute a single step in the workflow"""
-        start_time = datetime.utcnow()
+        start_time = time.perf_counter()
         
         try:
             if step.step_type == AgentStepType.RESEARCH:
@@ -220,14 +394,12 @@ class AgentOrchestrator:
             else:
                 raise ValueError(f"Unknown step type: {step.step_type}")
             
-            execution_time = (datetime.utcnow() - start_time).total_seconds()
-            step.execution_time = execution_time
+            step.execution_time = time.perf_counter() - start_time
             
             return result
             
         except Exception as e:
-            execution_time = (datetime.utcnow() - start_time).total_seconds()
-            step.execution_time = execution_time
+            step.execution_time = time.perf_counter() - start_time
             step.error = str(e)
             raise
     
@@ -308,14 +480,14 @@ class AgentOrchestrator:
         elif tool_name == 'image_caption':
             image_path = tool_params.get('image_path', '')
             if image_path:
-                caption = blip2_service.generate_caption(image_path)
+                caption = await blip2_service.generate_caption_async(image_path)
                 return {'caption': caption, 'image_path': image_path}
         
         elif tool_name == 'image_question':
             image_path = tool_params.get('image_path', '')
             question = tool_params.get('question', '')
             if image_path and question:
-                answer = blip2_service.answer_question(image_path, question)
+                answer = await blip2_service.answer_question_async(image_path, question)
                 return {'answer': answer, 'image_path': image_path, 'question': question}
         
         else:
@@ -331,7 +503,7 @@ class AgentOrchestrator:
         decision_context = step.parameters.get('context', context)
         decision_criteria = step.parameters.get('criteria', 'Make the best decision based on the provided context')
         
-        decision_query = f"Make a decision based on the following context and criteria:\nContext: {decision_context}\nCriteria: {decision_criteria}"
+        decision_query = f"Make a decision based on the following criteria and context:\nCriteria: {decision_criteria}\nContext: {decision_context}"
         decision = await get_llm_response(
             query=decision_query,
             context=""
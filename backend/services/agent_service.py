@@ -1,10 +1,34 @@
 import asyncio
-from typing import Dict, Any, List
-from datetime import datetime
+from typing import Dict, Any, List, NamedTuple
 
 from ..models.content import AgentRequest, AgentResponse
 from ..services.query_service import semantic_search_and_answer
 from ..utils.llm_client import get_llm_response
+from ..utils.embeddings import embedding_service
+from ..utils.timestamps import WorkflowClock, utc_now
+
+
+class StepRecord(NamedTuple):
+    """
+    Compact record of a completed workflow step, converted to a dict only
+    when the response is built
+    """
+    step: int
+    description: str
+    action: str
+    query: str
+    results_count: int
+    t_offset_us: int
+    summary: str
+    status: str = "completed"
+
+
+def _step_prompt(instruction: str, query: str) -> str:
+    """
+    Build a step prompt with the static instruction first and the user query
+    last, so consecutive steps share a cacheable prompt prefix
+    """
+    return f"{instruction}\n\nUser query: {query}"
 
 
 async def execute_agent_workflow(
@@ -16,23 +40,24 @@ async def execute_agent_workflow(
     Execute multi-step AI workflow based on the requested workflow type
     """
     steps = []
+    clock = WorkflowClock()
     
     try:
         if workflow_type == "research":
             # Multi-step research workflow
-            steps = await _execute_research_workflow(query, context)
+            steps = await _execute_research_workflow(query, context, clock)
         elif workflow_type == "analysis":
             # Analytical workflow
-            steps = await _execute_analysis_workflow(query, context)
+            steps = await _execute_analysis_workflow(query, context, clock)
         elif workflow_type == "summarization":
             # Summarization workflow
-            steps = await _execute_summarization_workflow(query, context)
+            steps = await _execute_summarization_workflow(query, context, clock)
         else:
             # Default workflow
-            steps = await _execute_default_workflow(query, context)
+            steps = await _execute_default_workflow(query, context, clock)
         
         # Generate final response based on all steps
-        step_summaries = [step.get("summary", "") for step in steps if step.get("summary")]
+        step_summaries = [step.summary for step in steps if step.summary]
         context_summary = "\n\n".join(step_summaries)
         
         final_response = await get_llm_response(
@@ -42,9 +67,9 @@ async def execute_agent_workflow(
         
         return AgentResponse(
             query=query,
-            steps=steps,
+            steps=clock.stamp([step._asdict() for step in steps]),
             final_response=final_response,
-            timestamp=datetime.utcnow()
+            timestamp=utc_now()
         )
         
     except Exception as e:
@@ -53,19 +78,21 @@ async def execute_agent_workflow(
             "step": "error",
             "description": f"Workflow execution failed: {str(e)}",
             "status": "failed",
-            "timestamp": datetime.utcnow().isoformat()
+            "t_offset_us": clock.offset_us()
         }
-        steps.append(error_step)
-        
         return AgentResponse(
             query=query,
-            steps=steps,
+            steps=clock.stamp([step._asdict() for step in steps] + [error_step]),
             final_response=f"Workflow failed: {str(e)}",
-            timestamp=datetime.utcnow()
+            timestamp=utc_now()
         )
 
 
-async def _execute_default_workflow(query: str, context: Dict[str, Any]) -> List[Dict[str, Any]]:
+async def _execute_default_workflow(
+    query: str,
+    context: Dict[str, Any],
+    clock: WorkflowClock
+) -> List[StepRecord]:
     """
     Default workflow: simple query -> search -> response
     """
@@ -73,167 +100,178 @@ async def _execute_default_workflow(query: str, context: Dict[str, Any]) -> List
     
     # Step 1: Semantic search
     search_result = await semantic_search_and_answer(query, top_k=5)
-    steps.append({
-        "step": 1,
-        "description": "Performed semantic search",
-        "action": "semantic_search",
-        "query": query,
-        "results_count": len(search_result.sources) if search_result.sources else 0,
-        "status": "completed",
-        "timestamp": datetime.utcnow().isoformat(),
-        "summary": f"Found {len(search_result.sources) if search_result.sources else 0} relevant sources"
-    })
+    steps.append(StepRecord(
+        step=1,
+        description="Performed semantic search",
+        action="semantic_search",
+        query=query,
+        results_count=len(search_result.sources) if search_result.sources else 0,
+        t_offset_us=clock.offset_us(),
+        summary=f"Found {len(search_result.sources) if search_result.sources else 0} relevant sources"
+    ))
     
     return steps
 
 
-async def _execute_research_workflow(query: str, context: Dict[str, Any]) -> List[Dict[str, Any]]:
+async def _execute_research_workflow(
+    query: str,
+    context: Dict[str, Any],
+    clock: WorkflowClock
+) -> List[StepRecord]:
     """
     Research workflow: multi-step research process
     """
     steps = []
     
+    # Build every step query up front and embed them in a single batch
+    follow_up_query = _step_prompt("Based on these results, what are the key themes and insights?", query)
+    synthesis_query = _step_prompt("Synthesize the findings from previous steps into a comprehensive analysis.", query)
+    query_embeddings = await embedding_service.embed_queries([query, follow_up_query, synthesis_query])
+    
     # Step 1: Initial search
-    initial_search = await semantic_search_and_answer(query, top_k=5)
-    steps.append({
-        "step": 1,
-        "description": "Initial research query",
-        "action": "initial_search",
-        "query": query,
-        "results_count": len(initial_search.sources) if initial_search.sources else 0,
-        "status": "completed",
-        "timestamp": datetime.utcnow().isoformat(),
-        "summary": f"Initial search found {len(initial_search.sources) if initial_search.sources else 0} sources"
-    })
+    initial_search = await semantic_search_and_answer(query, top_k=5, query_embedding=query_embeddings[0])
+    steps.append(StepRecord(
+        step=1,
+        description="Initial research query",
+        action="initial_search",
+        query=query,
+        results_count=len(initial_search.sources) if initial_search.sources else 0,
+        t_offset_us=clock.offset_us(),
+        summary=f"Initial search found {len(initial_search.sources) if initial_search.sources else 0} sources"
+    ))
     
     # Step 2: Follow-up questions based on initial results
-    follow_up_query = f"Based on these results, what are the key themes and insights related to {query}?"
-    follow_up_result = await semantic_search_and_answer(follow_up_query, top_k=3)
-    steps.append({
-        "step": 2,
-        "description": "Follow-up research for key themes",
-        "action": "follow_up_search",
-        "query": follow_up_query,
-        "results_count": len(follow_up_result.sources) if follow_up_result.sources else 0,
-        "status": "completed",
-        "timestamp": datetime.utcnow().isoformat(),
-        "summary": f"Follow-up search identified key themes from {len(follow_up_result.sources) if follow_up_result.sources else 0} additional sources"
-    })
+    follow_up_result = await semantic_search_and_answer(follow_up_query, top_k=3, query_embedding=query_embeddings[1])
+    steps.append(StepRecord(
+        step=2,
+        description="Follow-up research for key themes",
+        action="follow_up_search",
+        query=follow_up_query,
+        results_count=len(follow_up_result.sources) if follow_up_result.sources else 0,
+        t_offset_us=clock.offset_us(),
+        summary=f"Follow-up search identified key themes from {len(follow_up_result.sources) if follow_up_result.sources else 0} additional sources"
+    ))
     
     # Step 3: Synthesis
-    synthesis_query = f"Synthesize the findings from previous steps about {query} into a comprehensive analysis"
-    synthesis_result = await semantic_search_and_answer(synthesis_query, top_k=3)
-    steps.append({
-        "step": 3,
-        "description": "Synthesize findings",
-        "action": "synthesis",
-        "query": synthesis_query,
-        "results_count": len(synthesis_result.sources) if synthesis_result.sources else 0,
-        "status": "completed",
-        "timestamp": datetime.utcnow().isoformat(),
-        "summary": "Synthesized findings into comprehensive analysis"
-    })
+    synthesis_result = await semantic_search_and_answer(synthesis_query, top_k=3, query_embedding=query_embeddings[2])
+    steps.append(StepRecord(
+        step=3,
+        description="Synthesize findings",
+        action="synthesis",
+        query=synthesis_query,
+        results_count=len(synthesis_result.sources) if synthesis_result.sources else 0,
+        t_offset_us=clock.offset_us(),
+        summary="Synthesized findings into comprehensive analysis"
+    ))
     
     return steps
 
 
-async def _execute_analysis_workflow(query: str, context: Dict[str, Any]) -> List[Dict[str, Any]]:
+async def _execute_analysis_workflow(
+    query: str,
+    context: Dict[str, Any],
+    clock: WorkflowClock
+) -> List[StepRecord]:
     """
     Analysis workflow: structured analytical process
     """
     steps = []
     
+    # Build every step query up front and embed them in a single batch
+    gathering_query = _step_prompt("Find all relevant information.", query)
+    analysis_query = _step_prompt("Analyze the gathered information. Identify patterns, trends, and relationships.", query)
+    conclusion_query = _step_prompt("Provide a conclusion based on the analysis.", query)
+    query_embeddings = await embedding_service.embed_queries([gathering_query, analysis_query, conclusion_query])
+    
     # Step 1: Data gathering
-    gathering_query = f"Find all relevant information about {query}"
-    gathering_result = await semantic_search_and_answer(gathering_query, top_k=7)
-    steps.append({
-        "step": 1,
-        "description": "Gather relevant data",
-        "action": "data_gathering",
-        "query": gathering_query,
-        "results_count": len(gathering_result.sources) if gathering_result.sources else 0,
-        "status": "completed",
-        "timestamp": datetime.utcnow().isoformat(),
-        "summary": f"Gathered data from {len(gathering_result.sources) if gathering_result.sources else 0} sources"
-    })
+    gathering_result = await semantic_search_and_answer(gathering_query, top_k=7, query_embedding=query_embeddings[0])
+    steps.append(StepRecord(
+        step=1,
+        description="Gather relevant data",
+        action="data_gathering",
+        query=gathering_query,
+        results_count=len(gathering_result.sources) if gathering_result.sources else 0,
+        t_offset_us=clock.offset_us(),
+        summary=f"Gathered data from {len(gathering_result.sources) if gathering_result.sources else 0} sources"
+    ))
     
     # Step 2: Analysis
-    analysis_query = f"Analyze the gathered information about {query}. Identify patterns, trends, and relationships."
-    analysis_result = await semantic_search_and_answer(analysis_query, top_k=5)
-    steps.append({
-        "step": 2,
-        "description": "Analyze gathered information",
-        "action": "analysis",
-        "query": analysis_query,
-        "results_count": len(analysis_result.sources) if analysis_result.sources else 0,
-        "status": "completed",
-        "timestamp": datetime.utcnow().isoformat(),
-        "summary": "Completed analysis identifying patterns and trends"
-    })
+    analysis_result = await semantic_search_and_answer(analysis_query, top_k=5, query_embedding=query_embeddings[1])
+    steps.append(StepRecord(
+        step=2,
+        description="Analyze gathered information",
+        action="analysis",
+        query=analysis_query,
+        results_count=len(analysis_result.sources) if analysis_result.sources else 0,
+        t_offset_us=clock.offset_us(),
+        summary="Completed analysis identifying patterns and trends"
+    ))
     
     # Step 3: Conclusion
-    conclusion_query = f"Provide a conclusion based on the analysis of {query}"
-    conclusion_result = await semantic_search_and_answer(conclusion_query, top_k=3)
-    steps.append({
-        "step": 3,
-        "description": "Draw conclusions",
-        "action": "conclusion",
-        "query": conclusion_query,
-        "results_count": len(conclusion_result.sources) if conclusion_result.sources else 0,
-        "status": "completed",
-        "timestamp": datetime.utcnow().isoformat(),
-        "summary": "Drew conclusions from the analysis"
-    })
+    conclusion_result = await semantic_search_and_answer(conclusion_query, top_k=3, query_embedding=query_embeddings[2])
+    steps.append(StepRecord(
+        step=3,
+        description="Draw conclusions",
+        action="conclusion",
+        query=conclusion_query,
+        results_count=len(conclusion_result.sources) if conclusion_result.sources else 0,
+        t_offset_us=clock.offset_us(),
+        summary="Drew conclusions from the analysis"
+    ))
     
     return steps
 
 
-async def _execute_summarization_workflow(query: str, context: Dict[str, Any]) -> List[Dict[str, Any]]:
+async def _execute_summarization_workflow(
+    query: str,
+    context: Dict[str, Any],
+    clock: WorkflowClock
+) -> List[StepRecord]:
     """
     Summarization workflow: extract and summarize key information
     """
     steps = []
     
+    # Build every step query up front and embed them in a single batch
+    search_query = _step_prompt("Find the most relevant documents.", query)
+    extract_query = _step_prompt("Extract the key points from these documents.", query)
+    summary_query = _step_prompt("Generate a concise summary based on the extracted key points.", query)
+    query_embeddings = await embedding_service.embed_queries([search_query, extract_query, summary_query])
+    
     # Step 1: Identify key documents
-    search_query = f"Find the most relevant documents about {query}"
-    search_result = await semantic_search_and_answer(search_query, top_k=10)
-    steps.append({
-        "step": 1,
-        "description": "Identify key documents",
-        "action": "document_identification",
-        "query": search_query,
-        "results_count": len(search_result.sources) if search_result.sources else 0,
-        "status": "completed",
-        "timestamp": datetime.utcnow().isoformat(),
-        "summary": f"Identified {len(search_result.sources) if search_result.sources else 0} key documents"
-    })
+    search_result = await semantic_search_and_answer(search_query, top_k=10, query_embedding=query_embeddings[0])
+    steps.append(StepRecord(
+        step=1,
+        description="Identify key documents",
+        action="document_identification",
+        query=search_query,
+        results_count=len(search_result.sources) if search_result.sources else 0,
+        t_offset_us=clock.offset_us(),
+        summary=f"Identified {len(search_result.sources) if search_result.sources else 0} key documents"
+    ))
     
     # Step 2: Extract key points
-    extract_query = f"Extract the key points from these documents about {query}"
-    extract_result = await semantic_search_and_answer(extract_query, top_k=8)
-    steps.append({
-        "step": 2,
-        "description": "Extract key points",
-        "action": "key_point_extraction",
-        "query": extract_query,
-        "results_count": len(extract_result.sources) if extract_result.sources else 0,
-        "status": "completed",
-        "timestamp": datetime.utcnow().isoformat(),
-        "summary": "Extracted key points from documents"
-    })
+    extract_result = await semantic_search_and_answer(extract_query, top_k=8, query_embedding=query_embeddings[1])
+    steps.append(StepRecord(
+        step=2,
+        description="Extract key points",
+        action="key_point_extraction",
+        query=extract_query,
+        results_count=len(extract_result.sources) if extract_result.sources else 0,
+        t_offset_us=clock.offset_us(),
+        summary="Extracted key points from documents"
+    ))
     
     # Step 3: Generate summary
-    summary_query = f"Generate a concise summary of {query} based on the extracted key points"
-    summary_result = await semantic_search_and_answer(summary_query, top_k=5)
-    steps.append({
-        "step": 3,
-        "description": "Generate summary",
-        "action": "summary_generation",
-        "query": summary_query,
-        "results_count": len(summary_result.sources) if summary_result.sources else 0,
-        "status": "completed",
-        "timestamp": datetime.utcnow().isoformat(),
-        "summary": "Generated concise summary"
-    })
-    
-    return steps
\ No newline at end of file
+    summary_result = await semantic_search_and_answer(summary_query, top_k=5, query_embedding=query_embeddings[2])
+    steps.append(StepRecord(
+        step=3,
+        description="Generate summary",
+        action="summary_generation",
+        query=summary_query,
+        results_count=len(summary_result.sources) if summary_result.sources else 0,
+        t_offset_us=clock.offset_us(),
+        summary="Generated concise summary"
+    ))
+    
+    return steps
@@ -1,8 +1,9 @@
-import torch
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
-from transformers import Blip2Processor, Blip2ForConditionalGeneration
 import os
-from typing import Optional
+from typing import Optional, Dict, Tuple, Union
 import logging
 
 logger = logging.getLogger(__name__)
@@ -10,80 +11,183 @@ logger = logging.getLogger(__name__)
 class BLIP2Service:
     def __init__(self):
         self.model_name = os.getenv("BLIP2_MODEL_NAME", "Salesforce/blip2-opt-2.7b")
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        # "cuda" or "cpu"; "auto" picks cuda when available once the model loads
+        self.device = os.getenv("BLIP2_DEVICE", "auto")
         self.processor = None
         self.model = None
-        self._load_model()
-    
+        self._load_lock = threading.Lock()
+
+        # Image decode/preprocessing and the H2D copy run on a small pool so they
+        # overlap with generation, which is serialized on a single worker thread
+        self._preprocess_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("BLIP2_PREPROCESS_WORKERS", "2")),
+            thread_name_prefix="blip2-preprocess"
+        )
+        self._generate_executor = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="blip2-generate"
+        )
+        self._thread_local = threading.local()
+
+    # torch, transformers and the model weights are loaded on first use, so
+    # importing the service (e.g. for its routes) stays cheap
+
+    @property
+    def dtype(self) -> "torch.dtype":
+        import torch
+        return torch.float16 if self.device == "cuda" else torch.float32
+
+    def _ensure_model(self):
+        """Load the model once, whichever worker thread gets there first"""
+        if self.model is None:
+            with self._load_lock:
+                if self.model is None:
+                    self._load_model()
+
     def _load_model(self):
         """Load the BLIP-2 model and processor"""
+        import torch
+        from transformers import Blip2Processor, Blip2ForConditionalGeneration
+        if self.device == "auto":
+            self.device = "cuda" if torch.cuda.is_available() else "cpu"
         try:
             logger.info(f"Loading BLIP-2 model: {self.model_name} on {self.device}")
             self.processor = Blip2Processor.from_pretrained(self.model_name)
             self.model = Blip2ForConditionalGeneration.from_pretrained(
                 self.model_name,
-                torch_dtype=torch.float16 if self.device == "cuda" else torch.float32,
+                torch_dtype=self.dtype,
                 device_map="auto"  # Use accelerate to automatically distribute model across devices
             )
             logger.info("BLIP-2 model loaded successfully")
         except Exception as e:
             logger.error(f"Failed to load BLIP-2 model: {str(e)}")
             raise
-    
+
+    def _copy_stream(self) -> Optional["torch.cuda.Stream"]:
+        """CUDA stream owned by the calling worker thread (None on CPU)"""
+        if self.device != "cuda":
+            return None
+        stream = getattr(self._thread_local, "stream", None)
+        if stream is None:
+            import torch
+            stream = torch.cuda.Stream()
+            self._thread_local.stream = stream
+        return stream
+
+    def _prepare_inputs(
+        self,
+        image_path: Union[str, Image.Image],
+        text: Optional[str] = None
+    ) -> Tuple[Dict[str, "torch.Tensor"], Optional["torch.cuda.Event"]]:
+        """Decode and preprocess an image (path or PIL image), then copy the tensors to the model device"""
+        import torch
+        self._ensure_model()
+        image = image_path if isinstance(image_path, Image.Image) else Image.open(image_path)
+        image = image.convert('RGB')
+
+        if text:
+            inputs = self.processor(images=image, text=text, return_tensors="pt")
+        else:
+            inputs = self.processor(images=image, return_tensors="pt")
+
+        stream = self._copy_stream()
+        if stream is None:
+            return {
+                key: value.to(self.dtype) if value.is_floating_point() else value
+                for key, value in inputs.items()
+            }, None
+
+        # Pinned host memory lets the copy run asynchronously on this thread's stream
+        with torch.cuda.stream(stream):
+            device_inputs = {
+                key: value.pin_memory().to(
+                    self.device,
+                    dtype=self.dtype if value.is_floating_point() else value.dtype,
+                    non_blocking=True
+                )
+                for key, value in inputs.items()
+            }
+            ready = torch.cuda.Event()
+            ready.record(stream)
+
+        return device_inputs, ready
+
+    def _generate(
+        self,
+        inputs: Dict[str, "torch.Tensor"],
+        ready: Optional["torch.cuda.Event"],
+        max_new_tokens: int
+    ) -> str:
+        """Run generation on prepared inputs and decode the first sequence"""
+        import torch
+        if ready is not None:
+            torch.cuda.current_stream().wait_event(ready)
+
+        with torch.inference_mode():
+            generated_ids = self.model.generate(**inputs, max_new_tokens=max_new_tokens)
+        return self.processor.batch_decode(generated_ids, skip_special_tokens=True)[0].strip()
+
+    async def _run_async(self, image_path: Union[str, Image.Image], text: Optional[str], max_new_tokens: int) -> str:
+        """Preprocess and generate off the event loop"""
+        loop = asyncio.get_running_loop()
+        inputs, ready = await loop.run_in_executor(
+            self._preprocess_executor, self._prepare_inputs, image_path, text
+        )
+        return await loop.run_in_executor(
+            self._generate_executor, self._generate, inputs, ready, max_new_tokens
+        )
+
     def generate_caption(self, image_path: str) -> str:
         """Generate a caption for an image"""
         try:
-            # Load and preprocess image
-            image = Image.open(image_path).convert('RGB')
-            
-            # Process image
-            inputs = self.processor(images=image, return_tensors="pt").to(self.device, torch.float16)
-            
-            # Generate caption
-            generated_ids = self.model.generate(**inputs, max_new_tokens=50)
-            caption = self.processor.batch_decode(generated_ids, skip_special_tokens=True)[0].strip()
-            
-            return caption
+            inputs, ready = self._prepare_inputs(image_path)
+            return self._generate(inputs, ready, max_new_tokens=50)
+        except Exception as e:
+            logger.error(f"Error generating caption: {str(e)}")
+            return f"Error generating caption: {str(e)}"
+
+    async def generate_caption_async(self, image_path: Union[str, Image.Image]) -> str:
+        """Generate a caption for an image without blocking the event loop"""
+        try:
+            return await self._run_async(image_path, None, max_new_tokens=50)
         except Exception as e:
             logger.error(f"Error generating caption: {str(e)}")
             return f"Error generating caption: {str(e)}"
-    
+
     def answer_question(self, image_path: str, question: str) -> str:
         """Answer a question about an image"""
         try:
-            # Load and preprocess image
-            image = Image.open(image_path).convert('RGB')
-            
-            # Process image and question
-            inputs = self.processor(images=image, text=question, return_tensors="pt").to(self.device, torch.float16)
-            
-            # Generate answer
-            generated_ids = self.model.generate(**inputs, max_new_tokens=50)
-            answer = self.processor.batch_decode(generated_ids, skip_special_tokens=True)[0].strip()
-            
-            return answer
+            inputs, ready = self._prepare_inputs(image_path, question)
+            return self._generate(inputs, ready, max_new_tokens=50)
+        except Exception as e:
+            logger.error(f"Error answering question: {str(e)}")
+            return f"Error answering question: {str(e)}"
+
+    async def answer_question_async(self, image_path: str, question: str) -> str:
+        """Answer a question about an image without blocking the event loop"""
+        try:
+            return await self._run_async(image_path, question, max_new_tokens=50)
         except Exception as e:
             logger.error(f"Error answering question: {str(e)}")
             return f"Error answering question: {str(e)}"
-    
+
     def generate_text_with_image(self, image_path: str, prompt: str = "") -> str:
         """Generate text based on image and optional prompt"""
         try:
-            # Load and preprocess image
-            image = Image.open(image_path).convert('RGB')
-            
-            # Process image with optional prompt
-            inputs = self.processor(images=image, text=prompt, return_tensors="pt").to(self.device, torch.float16)
-            
-            # Generate text
-            generated_ids = self.model.generate(**inputs, max_new_tokens=100)
-            result = self.processor.batch_decode(generated_ids, skip_special_tokens=True)[0].strip()
-            
-            return result
+            inputs, ready = self._prepare_inputs(image_path, prompt)
+            return self._generate(inputs, ready, max_new_tokens=100)
+        except Exception as e:
+            logger.error(f"Error generating text with image: {str(e)}")
+            return f"Error generating text with image: {str(e)}"
+
+    async def generate_text_with_image_async(self, image_path: str, prompt: str = "") -> str:
+        """Generate text based on image and optional prompt without blocking the event loop"""
+        try:
+            return await self._run_async(image_path, prompt, max_new_tokens=100)
         except Exception as e:
             logger.error(f"Error generating text with image: {str(e)}")
             return f"Error generating text with image: {str(e)}"
 
 
 # Global instance
-blip2_service = BLIP2Service()
\ No newline at end of file
+blip2_service = BLIP2Service()
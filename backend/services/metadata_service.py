@@ -3,6 +3,13 @@ from datetime import datetime
 
 from ..models.content import ContentMetadata, ProcessingStatus
 from ..utils.database import get_content_metadata as db_get_content_metadata
+from ..utils.database import list_all_content as db_list_all_content
+# Re-exported as-is; the database layer already has the service signatures
+from ..utils.database import update_content_metadata, delete_content
+from ..utils.query_cache import metadata_cache
+
+
+_CONTENT_METADATA_FIELDS = frozenset(ContentMetadata.__fields__)
 
 
 async def get_content_metadata(file_id: str) -> Optional[ContentMetadata]:
@@ -14,40 +21,22 @@ async def get_content_metadata(file_id: str) -> Optional[ContentMetadata]:
     if not metadata_dict:
         return None
     
-    # Convert database result to ContentMetadata model
-    return ContentMetadata(
-        file_id=metadata_dict.get('file_id'),
-        filename=metadata_dict.get('filename'),
-        content_type=metadata_dict.get('content_type'),
-        size=metadata_dict.get('size', 0),
-        upload_time=metadata_dict.get('upload_time') or datetime.utcnow(),
-        processing_status=ProcessingStatus(metadata_dict.get('processing_status', 'pending')),
-        extracted_text_length=metadata_dict.get('extracted_text_length'),
-        embedding_status=metadata_dict.get('embedding_status'),
-        tags=metadata_dict.get('tags', []),
-        metadata=metadata_dict.get('metadata', {})
-    )
-
-
-async def update_content_metadata(file_id: str, updates: Dict[str, Any]) -> bool:
-    """
-    Update metadata for a specific content file
-    """
-    from ..utils.database import update_content_metadata as db_update_content_metadata
-    return await db_update_content_metadata(file_id, updates)
+    # Convert database result to ContentMetadata model; NULL columns fall
+    # back to the model's field defaults (upload_time has none, so a row
+    # without one fails validation rather than reporting "now")
+    return ContentMetadata.parse_obj({
+        key: value for key, value in metadata_dict.items()
+        if value is not None and key in _CONTENT_METADATA_FIELDS
+    })
 
 
 async def list_all_content(limit: int = 100, offset: int = 0) -> list:
     """
-    List all content with pagination
-    """
-    from ..utils.database import list_all_content as db_list_all_content
-    return await db_list_all_content(limit, offset)
-
-
-async def delete_content(file_id: str) -> bool:
-    """
-    Delete content and its metadata
+    List all content with pagination, served from the metadata cache when possible
     """
-    from ..utils.database import delete_content as db_delete_content
-    return await db_delete_content(file_id)
\ No newline at end of file
+    key = (limit, offset)
+    content = metadata_cache.get(key)
+    if content is None:
+        content = await db_list_all_content(limit, offset)
+        metadata_cache.set(key, content)
+    return content
@@ -1,50 +1,124 @@
 import pinecone
 import asyncio
-from typing import List, Dict, Any, Optional
+import heapq
+import zlib
+from functools import partial
+from itertools import chain, islice
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
 from uuid import uuid4
 import logging
 
 from ..config.settings import settings
+from ..utils.query_cache import query_cache
+from ..utils.lexical_index import lexical_index
+from ..utils.rerank import chunk_reranker
 
 logger = logging.getLogger(__name__)
 
+
+def _chunks(iterable: Iterable, size: int) -> Iterator[Tuple]:
+    """Yield successive tuples of at most `size` items from an iterable"""
+    iterator = iter(iterable)
+    batch = tuple(islice(iterator, size))
+    while batch:
+        yield batch
+        batch = tuple(islice(iterator, size))
+
+
+def _as_list(embedding) -> List[float]:
+    """Convert a numpy embedding to a plain list once, before serialization"""
+    return embedding.tolist() if hasattr(embedding, 'tolist') else embedding
+
+
+def _chunk_metadata(file_id: str, chunk_id: int, chunk: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the metadata stored alongside a chunk vector"""
+    metadata = {
+        'file_id': file_id,
+        'chunk_id': chunk_id,
+        'content': chunk['content'],
+        'source_type': chunk.get('source_type') or 'document'
+    }
+    # Pinecone rejects null metadata values; readers use .get('page_number')
+    page_number = chunk.get('page_number')
+    if page_number is not None:
+        metadata['page_number'] = page_number
+    return metadata
+
+
+async def _run_blocking(func, *args, **kwargs):
+    """Run a blocking Pinecone SDK call in the default executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, partial(func, *args, **kwargs))
+
+
 class PineconeService:
     def __init__(self):
         self.index_name = settings.pinecone_index_name
         self.namespace = settings.pinecone_namespace
         self.dimension = 1536  # Default for text-embedding-ada-002
+        self.upsert_batch_size = settings.pinecone_upsert_batch_size
+        self.pool_threads = settings.pinecone_pool_threads
+        self.use_grpc = settings.pinecone_use_grpc
+        self.shards = max(1, settings.pinecone_shards)
         self._initialized = False
+        self._init_lock = None
         
     async def initialize(self):
         """Initialize Pinecone connection and create/index if needed"""
         if self._initialized:
             return
+        
+        # Created lazily so the lock binds to the running event loop
+        if self._init_lock is None:
+            self._init_lock = asyncio.Lock()
+        
+        async with self._init_lock:
+            if self._initialized:
+                return
             
-        try:
-            # Initialize Pinecone
-            pinecone.init(
-                api_key=settings.pinecone_api_key,
-                environment=settings.pinecone_environment
-            )
-            
-            # Check if index exists, create if not
-            if self.index_name not in pinecone.list_indexes():
-                pinecone.create_index(
-                    name=self.index_name,
-                    dimension=self.dimension,
-                    metric='cosine',
-                    pod_type='p1'
+            try:
+                # Initialize Pinecone
+                await _run_blocking(
+                    pinecone.init,
+                    api_key=settings.pinecone_api_key,
+                    environment=settings.pinecone_environment
                 )
-                logger.info(f"Created Pinecone index: {self.index_name}")
-            
-            # Connect to index
-            self.index = pinecone.Index(self.index_name)
-            self._initialized = True
-            logger.info("Pinecone service initialized successfully")
-            
-        except Exception as e:
-            logger.error(f"Failed to initialize Pinecone service: {str(e)}")
-            raise
+                
+                # Check if index exists, create if not
+                if self.index_name not in await _run_blocking(pinecone.list_indexes):
+                    await _run_blocking(
+                        pinecone.create_index,
+                        name=self.index_name,
+                        dimension=self.dimension,
+                        metric='cosine',
+                        pod_type='p1'
+                    )
+                    logger.info(f"Created Pinecone index: {self.index_name}")
+                
+                # Connect to index. The gRPC client multiplexes calls over one
+                # persistent HTTP/2 channel; for REST, pool_threads backs the
+                # async_req upserts and the threads queries run on
+                if self.use_grpc:
+                    self.index = pinecone.GRPCIndex(self.index_name)
+                else:
+                    self.index = pinecone.Index(self.index_name, pool_threads=self.pool_threads)
+                self._initialized = True
+                logger.info("Pinecone service initialized successfully")
+                
+            except Exception as e:
+                logger.error(f"Failed to initialize Pinecone service: {str(e)}")
+                raise
+    
+    def _shard_namespace(self, file_id: str) -> str:
+        """Namespace holding a file's vectors; crc32 keeps the mapping stable across processes"""
+        if self.shards == 1:
+            return self.namespace
+        return f"{self.namespace}_{zlib.crc32(file_id.encode()) % self.shards}"
+    
+    def _all_namespaces(self) -> List[str]:
+        if self.shards == 1:
+            return [self.namespace]
+        return [f"{self.namespace}_{shard}" for shard in range(self.shards)]
     
     async def upsert_embeddings(self, file_id: str, chunks: List[Dict[str, Any]]) -> bool:
         """Upsert document chunks with embeddings to Pinecone"""
@@ -52,30 +126,35 @@ class PineconeService:
             if not self._initialized:
                 await self.initialize()
             
-            # Prepare vectors for upsert
-            vectors = []
-            for i, chunk in enumerate(chunks):
-                vector_id = f"{file_id}_{i}"
-                vector = [
-                    vector_id,
-                    chunk['embedding'],
-                    {
-                        'file_id': file_id,
-                        'chunk_id': i,
-                        'content': chunk['content'],
-                        'source_type': chunk.get('source_type', 'document'),
-                        'page_number': chunk.get('page_number', None)
-                    }
-                ]
-                vectors.append(vector)
-            
-            # Upsert vectors to Pinecone
-            self.index.upsert(
-                vectors=vectors,
-                namespace=self.namespace
+            # Prepare vectors lazily. Vector ids follow the chunk's own chunk_id
+            # so a file can be upserted in several calls without ids colliding
+            vectors = (
+                (f"{file_id}_{chunk_id}", _as_list(chunk['embedding']), _chunk_metadata(file_id, chunk_id, chunk))
+                for chunk_id, chunk in (
+                    (chunk.get('chunk_id', i), chunk) for i, chunk in enumerate(chunks)
+                )
             )
             
-            logger.info(f"Upserted {len(vectors)} vectors for file {file_id}")
+            # Send batches that stay under Pinecone's per-request limit, with
+            # all batches in flight at once
+            async_results = [
+                self.index.upsert(
+                    vectors=list(batch),
+                    namespace=self._shard_namespace(file_id),
+                    async_req=True
+                )
+                for batch in _chunks(vectors, self.upsert_batch_size)
+            ]
+            
+            await asyncio.gather(*(
+                _run_blocking(result.result if self.use_grpc else result.get)
+                for result in async_results
+            ))
+            
+            logger.info(
+                f"Upserted {len(chunks)} vectors for file {file_id} "
+                f"in {len(async_results)} batches"
+            )
             return True
             
         except Exception as e:
@@ -89,31 +168,79 @@ class PineconeService:
                 await self.initialize()
             
             # Query Pinecone
-            query_response = self.index.query(
-                vector=query_embedding,
-                top_k=top_k,
-                namespace=self.namespace,
-                include_metadata=True
-            )
-            
-            results = []
-            for match in query_response['matches']:
-                results.append({
-                    'id': match['id'],
-                    'score': match['score'],
-                    'content': match['metadata']['content'],
-                    'file_id': match['metadata']['file_id'],
-                    'chunk_id': match['metadata']['chunk_id'],
-                    'source_type': match['metadata']['source_type'],
-                    'page_number': match['metadata'].get('page_number')
-                })
-            
-            return results
+            return await self._query_shards(query_embedding, top_k)
             
         except Exception as e:
             logger.error(f"Failed to query embeddings: {str(e)}")
             return []
     
+    async def query_embeddings_batch(
+        self,
+        query_embeddings: List[List[float]],
+        top_k: int = 5
+    ) -> List[List[Dict[str, Any]]]:
+        """Query Pinecone for several embeddings in parallel, preserving input order"""
+        try:
+            if not self._initialized:
+                await self.initialize()
+            
+            # Fan the queries out over the index's shared connection pool
+            return list(await asyncio.gather(*(
+                self._query_shards(query_embedding, top_k)
+                for query_embedding in query_embeddings
+            )))
+            
+        except Exception as e:
+            logger.error(f"Failed to batch query embeddings: {str(e)}")
+            return [[] for _ in query_embeddings]
+    
+    async def _query_shards(self, query_embedding: List[float], top_k: int) -> List[Dict[str, Any]]:
+        """Query every shard namespace in parallel and merge the local top-k lists"""
+        if self.shards == 1:
+            # A single namespace: one query, no fan-out or merge
+            return self._matches_to_results(
+                await self._submit_query(query_embedding, top_k, self.namespace)
+            )
+        
+        query_responses = await asyncio.gather(*(
+            self._submit_query(query_embedding, top_k, namespace)
+            for namespace in self._all_namespaces()
+        ))
+        return heapq.nlargest(
+            top_k,
+            chain.from_iterable(self._matches_to_results(response) for response in query_responses),
+            key=lambda result: result['score']
+        )
+    
+    def _submit_query(self, query_embedding: List[float], top_k: int, namespace: str):
+        """Start a query and return an awaitable for its response"""
+        # Index.query parses its response in place, so it cannot take
+        # async_req (the ApplyResult has no response to parse); in the default
+        # executor the REST pool and the gRPC channel are shared across threads
+        return _run_blocking(
+            self.index.query,
+            vector=_as_list(query_embedding),
+            top_k=top_k,
+            namespace=namespace,
+            include_metadata=True
+        )
+    
+    @staticmethod
+    def _matches_to_results(query_response) -> List[Dict[str, Any]]:
+        """Flatten the matches of a Pinecone query response"""
+        results = []
+        for match in query_response['matches']:
+            results.append({
+                'id': match['id'],
+                'score': match['score'],
+                'content': match['metadata']['content'],
+                'file_id': match['metadata']['file_id'],
+                'chunk_id': match['metadata']['chunk_id'],
+                'source_type': match['metadata']['source_type'],
+                'page_number': match['metadata'].get('page_number')
+            })
+        return results
+    
     async def delete_file_embeddings(self, file_id: str) -> bool:
         """Delete all embeddings for a specific file"""
         try:
@@ -131,6 +258,11 @@ class PineconeService:
             # For now, we'll skip this and handle it through metadata filtering
             
             logger.warning("Pinecone delete by metadata not implemented in this version")
+            
+            # Cached answers and lexical matches may cite the deleted file
+            lexical_index.remove_file(file_id)
+            chunk_reranker.remove_file(file_id)
+            query_cache.clear()
             return True  # Placeholder
             
         except Exception as e:
@@ -143,7 +275,7 @@ class PineconeService:
             if not self._initialized:
                 await self.initialize()
             
-            stats = self.index.describe_index_stats()
+            stats = await _run_blocking(self.index.describe_index_stats)
             return stats
             
         except Exception as e:
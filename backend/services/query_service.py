@@ -1,14 +1,18 @@
 import asyncio
-from typing import List, Optional, Dict, Any
+import json
+from typing import AsyncIterator, List, Optional, Dict, Any
 from datetime import datetime
 import time
 import logging
 
 from ..models.content import QueryRequest, QueryResponse, SearchResult
 from ..utils.llm_client import get_llm_response
-from ..utils.embeddings import semantic_search as vector_search
+# Re-exported: semantic search without generating a response
+from ..utils.embeddings import semantic_search
 from ..utils.database import get_content_by_ids
+from ..utils.query_cache import query_cache
 from ..services.pinecone_service import pinecone_service
+from ..services.rag_service import rag_pipeline
 from ..logging import get_logger
 from ..logging.metrics import metrics_tracker
 
@@ -18,27 +22,37 @@ logger = get_logger(__name__)
 async def semantic_search_and_answer(
     query: str, 
     top_k: int = 5, 
-    include_sources: bool = True
+    include_sources: bool = True,
+    query_embedding: Optional[List[float]] = None
 ) -> QueryResponse:
     """
-    Perform semantic search and generate AI-powered response using RAG pipeline
+    Perform semantic search and generate AI-powered response using RAG pipeline.
+    A precomputed query_embedding skips re-embedding the query.
+    Repeated queries are answered from the query cache.
     """
     start_time = time.time()
     
+    cache_key = query_cache.make_key(query, top_k, include_sources)
+    cached_response = query_cache.get(cache_key)
+    metrics_tracker.log_query_cache_lookup(hit=cached_response is not None)
+    if cached_response is not None:
+        metrics_tracker.log_query(query, time.time() - start_time, cached_response.sources)
+        return cached_response
+    
+    query_log = query if len(query) <= 100 else query[:100] + "..."
+    
     logger.info(
         f"Starting semantic search and answer",
         extra={
-            "query": query[:100] + "..." if len(query) > 100 else query,
+            "query": query_log,
             "top_k": top_k,
             "include_sources": include_sources
         }
     )
     
     try:
-        from ..services.rag_service import rag_pipeline
-        
         # Execute the RAG pipeline
-        result = await rag_pipeline.query(query, top_k)
+        result = await rag_pipeline.query(query, top_k, query_embedding=query_embedding)
         
         # Log RAG retrieval
         retrieved_count = len(result.get('retrieved_documents', []))
@@ -62,37 +76,43 @@ async def semantic_search_and_answer(
         logger.info(
             f"Semantic search and answer completed",
             extra={
-                "query": query[:100] + "..." if len(query) > 100 else query,
+                "query": query_log,
                 "response_time": response_time,
                 "retrieved_count": retrieved_count
             }
         )
         
-        return QueryResponse(
+        response = QueryResponse(
             query=query,
             response=result['response'],
             sources=sources if include_sources else None,
             timestamp=datetime.utcnow()
         )
+        # Only successful answers are cached; a failed or empty retrieval, or
+        # a failed generation, is retried by the next identical query
+        if not result.get('error') and not result.get('generation_failed') and result.get('retrieved_documents'):
+            query_cache.set(cache_key, response)
+        return response
     except Exception as e:
         response_time = time.time() - start_time
+        error_type = type(e).__name__
         
         logger.error(
             f"Semantic search and answer failed: {str(e)}",
             extra={
-                "query": query[:100] + "..." if len(query) > 100 else query,
+                "query": query_log,
                 "response_time": response_time,
-                "error_type": type(e).__name__
+                "error_type": error_type
             },
             exc_info=True
         )
         
         # Track the error in metrics
         metrics_tracker.log_error(
-            error_type=type(e).__name__,
+            error_type=error_type,
             error_message=str(e),
             context={
-                "query": query[:100] + "..." if len(query) > 100 else query,
+                "query": query_log,
                 "top_k": top_k,
                 "response_time": response_time
             }
@@ -101,11 +121,65 @@ async def semantic_search_and_answer(
         raise e
 
 
-async def semantic_search(query: str, top_k: int = 5) -> List[SearchResult]:
+async def semantic_search_and_answer_stream(
+    query: str,
+    top_k: int = 5,
+    include_sources: bool = True
+) -> AsyncIterator[str]:
     """
-    Perform semantic search without generating response
+    Perform semantic search and stream the AI-powered response as server-sent
+    events. The assembled response is cached for later identical queries.
     """
-    return await vector_search(query, top_k=top_k)
+    start_time = time.time()
+    
+    cache_key = query_cache.make_key(query, top_k, include_sources)
+    cached_response = query_cache.get(cache_key)
+    metrics_tracker.log_query_cache_lookup(hit=cached_response is not None)
+    if cached_response is not None:
+        metrics_tracker.log_query(query, time.time() - start_time, cached_response.sources)
+        yield _sse_event(cached_response.response)
+        yield "data: [DONE]\n\n"
+        return
+    
+    retrieved_results = await rag_pipeline.retrieve(query, top_k)
+    metrics_tracker.log_rag_retrieval(query, len(retrieved_results))
+    
+    sources = []
+    if include_sources:
+        for result in retrieved_results:
+            sources.append({
+                "content": result.content,
+                "score": result.score,
+                "source": result.source,
+                "page_number": result.source.get('page_number')
+            })
+    
+    tokens = []
+    generation_failed = False
+    try:
+        async for token in rag_pipeline.stream(query, top_k, retrieved_results=retrieved_results):
+            tokens.append(token)
+            yield _sse_event(token)
+    except Exception as e:
+        logger.error(f"Streaming generation failed: {str(e)}")
+        generation_failed = True
+        yield _sse_event(f"Sorry, I encountered an error generating a response: {str(e)}")
+    yield "data: [DONE]\n\n"
+    
+    metrics_tracker.log_query(query, time.time() - start_time, sources)
+    # As in semantic_search_and_answer, failed or empty answers are not cached
+    if not generation_failed and retrieved_results:
+        query_cache.set(cache_key, QueryResponse(
+            query=query,
+            response="".join(tokens).strip(),
+            sources=sources if include_sources else None,
+            timestamp=datetime.utcnow()
+        ))
+
+
+def _sse_event(data: str) -> str:
+    """Format a chunk of text as a server-sent event"""
+    return f"data: {json.dumps(data)}\n\n"
 
 
 async def query_with_rag(
@@ -117,19 +191,18 @@ async def query_with_rag(
     Query with RAG (Retrieval Augmented Generation)
     """
     start_time = time.time()
+    query_log = query if len(query) <= 100 else query[:100] + "..."
     
     logger.info(
         f"Starting RAG query",
         extra={
-            "query": query[:100] + "..." if len(query) > 100 else query,
+            "query": query_log,
             "top_k": top_k,
             "llm_model": llm_model
         }
     )
     
     try:
-        from ..services.rag_service import rag_pipeline
-        
         # Execute the RAG pipeline
         result = await rag_pipeline.query(query, top_k, model=llm_model)
         
@@ -145,7 +218,7 @@ async def query_with_rag(
         logger.info(
             f"RAG query completed",
             extra={
-                "query": query[:100] + "..." if len(query) > 100 else query,
+                "query": query_log,
                 "response_time": response_time,
                 "retrieved_count": retrieved_count
             }
@@ -160,23 +233,24 @@ async def query_with_rag(
         }
     except Exception as e:
         response_time = time.time() - start_time
+        error_type = type(e).__name__
         
         logger.error(
             f"RAG query failed: {str(e)}",
             extra={
-                "query": query[:100] + "..." if len(query) > 100 else query,
+                "query": query_log,
                 "response_time": response_time,
-                "error_type": type(e).__name__
+                "error_type": error_type
             },
             exc_info=True
         )
         
         # Track the error in metrics
         metrics_tracker.log_error(
-            error_type=type(e).__name__,
+            error_type=error_type,
             error_message=str(e),
             context={
-                "query": query[:100] + "..." if len(query) > 100 else query,
+                "query": query_log,
                 "top_k": top_k,
                 "llm_model": llm_model,
                 "response_time": response_time
@@ -1,88 +1,218 @@
 import asyncio
-from typing import List, Dict, Any, Optional
+import bisect
+import functools
+import itertools
+from collections import OrderedDict
+from typing import AsyncIterator, List, Dict, Any, Optional
 from datetime import datetime
+import time
 import logging
 
+import tiktoken
+
 from ..models.content import SearchResult
-from ..utils.llm_client import get_llm_response
-from ..utils.embeddings import semantic_search
+from ..utils.llm_client import ensure_session, get_llm_response, stream_llm_response
+from ..utils.embeddings import embedding_service, semantic_search, semantic_search_batch
+from ..utils.lexical_index import lexical_index, reciprocal_rank_fusion
+from ..utils.rerank import chunk_reranker
 from ..services.pinecone_service import pinecone_service
 from ..config import settings
 
 logger = logging.getLogger(__name__)
 
+
+@functools.lru_cache(maxsize=8)
+def _encoding_for_model(model: str) -> "tiktoken.Encoding":
+    """Tokenizer for a model, falling back to cl100k_base for unknown (e.g. local) models"""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
 class RAGPipeline:
     def __init__(self):
         self.top_k = 5
-        self.context_window_size = 2000  # Maximum context size in characters
+        self.context_token_budget = settings.context_token_budget  # Maximum context size in tokens
+        # LRU of token counts keyed on (encoding name, text)
+        self._token_count_cache: "OrderedDict[tuple, int]" = OrderedDict()
+        self.token_count_cache_size = 4096
     
-    async def retrieve(self, query: str, top_k: int = 5) -> List[SearchResult]:
-        """Retrieve relevant documents based on the query"""
+    async def retrieve(
+        self,
+        query: str,
+        top_k: int = 5,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[SearchResult]:
+        """
+        Retrieve relevant documents, fusing dense and BM25 results when chunks
+        are indexed and re-ranking the fused pool by cosine similarity if enabled
+        """
         try:
-            results = await semantic_search(query, top_k)
+            rerank = settings.rerank_enabled and len(chunk_reranker) > 0
+            if rerank and query_embedding is None:
+                query_embedding = (await embedding_service.embed_queries([query]))[0]
+            pool_size = top_k * 2 if rerank else top_k
+            
+            if len(lexical_index):
+                # Both retrievers run concurrently; dense search dominates the latency
+                dense, lexical = await asyncio.gather(
+                    semantic_search(query, top_k * 2, query_embedding),
+                    lexical_index.search_async(query, top_k * 2)
+                )
+                results = reciprocal_rank_fusion([dense, lexical], pool_size)
+            else:
+                results = await semantic_search(query, pool_size, query_embedding)
+            
+            if rerank:
+                results = chunk_reranker.rerank(query_embedding, results, top_k)
             logger.info(f"Retrieved {len(results)} results for query: {query[:50]}...")
             return results
         except Exception as e:
             logger.error(f"Error in retrieval: {str(e)}")
             return []
     
-    async def augment_context(self, query: str, retrieved_results: List[SearchResult]) -> str:
-        """Augment the query with retrieved context"""
+    async def retrieve_batch(self, queries: List[str], top_k: int = 5) -> List[List[SearchResult]]:
+        """Retrieve relevant documents for several queries in one batched search"""
+        try:
+            rerank = settings.rerank_enabled and len(chunk_reranker) > 0
+            pool_size = top_k * 2 if rerank else top_k
+            
+            if len(lexical_index):
+                dense_batches, *lexical_batches = await asyncio.gather(
+                    semantic_search_batch(queries, top_k * 2),
+                    *(lexical_index.search_async(query, top_k * 2) for query in queries)
+                )
+                results = [
+                    reciprocal_rank_fusion([dense, lexical], pool_size)
+                    for dense, lexical in zip(dense_batches, lexical_batches)
+                ]
+            else:
+                results = await semantic_search_batch(queries, pool_size)
+            
+            if rerank:
+                # Served from the query embedding cache filled by the search above
+                query_embeddings = await embedding_service.embed_queries(queries)
+                results = [
+                    chunk_reranker.rerank(query_embedding, pool, top_k)
+                    for query_embedding, pool in zip(query_embeddings, results)
+                ]
+            logger.info(f"Retrieved results for {len(queries)} queries")
+            return results
+        except Exception as e:
+            logger.error(f"Error in batch retrieval: {str(e)}")
+            return [[] for _ in queries]
+    
+    def _token_counts(self, encoding: "tiktoken.Encoding", texts: List[str]) -> List[int]:
+        """Token count of each text, tokenizing only uncached texts in one batch"""
+        cache = self._token_count_cache
+        counts: List[Optional[int]] = []
+        misses: Dict[str, None] = {}
+        for text in texts:
+            key = (encoding.name, text)
+            count = cache.get(key)
+            if count is not None:
+                cache.move_to_end(key)
+            else:
+                misses[text] = None
+            counts.append(count)
+        
+        if misses:
+            # Batch encoding runs on tiktoken's native thread pool
+            new_counts = {
+                text: len(tokens)
+                for text, tokens in zip(misses, encoding.encode_ordinary_batch(list(misses)))
+            }
+            for text, count in new_counts.items():
+                cache[(encoding.name, text)] = count
+            while len(cache) > self.token_count_cache_size:
+                cache.popitem(last=False)
+            counts = [
+                count if count is not None else new_counts[text]
+                for text, count in zip(texts, counts)
+            ]
+        
+        return counts
+    
+    async def augment_context(
+        self,
+        query: str,
+        retrieved_results: List[SearchResult],
+        model: str = None
+    ) -> str:
+        """Augment the query with retrieved context, within the context token budget"""
         if not retrieved_results:
             return f"Query: {query}\n\nNo relevant documents found."
         
-        # Combine retrieved documents into context
-        context_parts = [f"Query: {query}", "Relevant Documents:"]
+        encoding = _encoding_for_model(model or settings.default_llm_model)
+        headers = [f"\nDocument {i+1}: " for i in range(len(retrieved_results))]
+        contents = [result.content for result in retrieved_results]
+        doc_texts = [header + content for header, content in zip(headers, contents)]
         
-        total_chars = 0
-        for i, result in enumerate(retrieved_results):
-            doc_text = f"\nDocument {i+1}: {result.content}"
-            
-            # Check if adding this document would exceed context window
-            if total_chars + len(doc_text) > self.context_window_size:
-                logger.info(f"Context window limit reached. Stopping at {i+1} documents.")
-                break
-            
-            context_parts.append(doc_text)
-            total_chars += len(doc_text)
+        # Keep the longest prefix of documents whose cumulative token count fits.
+        # Header and content are counted separately so chunk counts can be
+        # cached across queries; the split can only overcount by a token or so.
+        cumulative_tokens = list(itertools.accumulate(
+            header_tokens + content_tokens
+            for header_tokens, content_tokens in zip(
+                self._token_counts(encoding, headers),
+                self._token_counts(encoding, contents)
+            )
+        ))
+        cutoff = bisect.bisect_right(cumulative_tokens, self.context_token_budget)
+        if cutoff < len(doc_texts):
+            logger.info(f"Context token budget reached. Stopping at {cutoff} documents.")
         
-        return "\n".join(context_parts)
+        # Combine retrieved documents into context
+        return "\n".join([f"Query: {query}", "Relevant Documents:"] + doc_texts[:cutoff])
     
     async def generate_response(self, query: str, context: str, model: str = None) -> str:
-        """Generate a response based on the query and context"""
-        try:
-            if model is None:
-                model = settings.default_llm_model
-            
-            response = await get_llm_response(
-                query=query,
-                context=context,
-                model=model
-            )
-            return response
-        except Exception as e:
-            logger.error(f"Error in generation: {str(e)}")
-            return f"Sorry, I encountered an error generating a response: {str(e)}"
+        """Generate a response based on the query and context; LLM errors are raised"""
+        if model is None:
+            model = settings.default_llm_model
+        
+        return await get_llm_response(
+            query=query,
+            context=context,
+            model=model,
+            raise_errors=True
+        )
     
-    async def query(self, query: str, top_k: int = 5, model: str = None) -> Dict[str, Any]:
-        """Execute the full RAG pipeline"""
-        start_time = datetime.utcnow()
+    async def query(
+        self,
+        query: str,
+        top_k: int = 5,
+        model: str = None,
+        query_embedding: Optional[List[float]] = None,
+        retrieved_results: Optional[List[SearchResult]] = None
+    ) -> Dict[str, Any]:
+        """Execute the full RAG pipeline, skipping retrieval if results are given"""
+        start_time = time.perf_counter()
         
         try:
-            # Step 1: Retrieve relevant documents
-            retrieved_results = await self.retrieve(query, top_k)
+            # Step 1: Retrieve relevant documents, warming the LLM connection meanwhile
+            if retrieved_results is None:
+                retrieved_results, _ = await asyncio.gather(
+                    self.retrieve(query, top_k, query_embedding),
+                    ensure_session(model)
+                )
             
             # Step 2: Augment context with retrieved documents
-            context = await self.augment_context(query, retrieved_results)
+            context = await self.augment_context(query, retrieved_results, model)
             
             # Step 3: Generate response based on context
-            response = await self.generate_response(query, context, model)
-            
-            end_time = datetime.utcnow()
+            generation_failed = False
+            try:
+                response = await self.generate_response(query, context, model)
+            except Exception as e:
+                logger.error(f"Error in generation: {str(e)}")
+                response = f"Sorry, I encountered an error generating a response: {str(e)}"
+                generation_failed = True
             
             return {
                 "query": query,
                 "response": response,
+                "generation_failed": generation_failed,
                 "retrieved_documents": [
                     {
                         "content": result.content,
@@ -91,8 +221,8 @@ class RAGPipeline:
                     } for result in retrieved_results
                 ],
                 "context_used": context,
-                "processing_time": (end_time - start_time).total_seconds(),
-                "timestamp": end_time.isoformat()
+                "processing_time": time.perf_counter() - start_time,
+                "timestamp": datetime.utcnow().isoformat()
             }
             
         except Exception as e:
@@ -100,20 +230,53 @@ class RAGPipeline:
             return {
                 "query": query,
                 "response": f"Sorry, an error occurred: {str(e)}",
+                "generation_failed": True,
                 "retrieved_documents": [],
                 "context_used": "",
-                "processing_time": (datetime.utcnow() - start_time).total_seconds(),
+                "processing_time": time.perf_counter() - start_time,
                 "timestamp": datetime.utcnow().isoformat(),
                 "error": str(e)
             }
     
+    async def stream(
+        self,
+        query: str,
+        top_k: int = 5,
+        model: str = None,
+        retrieved_results: Optional[List[SearchResult]] = None
+    ) -> AsyncIterator[str]:
+        """Execute the RAG pipeline, yielding the response as it is generated; LLM errors are raised"""
+        if model is None:
+            model = settings.default_llm_model
+        
+        if retrieved_results is None:
+            retrieved_results, _ = await asyncio.gather(
+                self.retrieve(query, top_k),
+                ensure_session(model)
+            )
+        
+        context = await self.augment_context(query, retrieved_results, model)
+        async for token in stream_llm_response(query=query, context=context, model=model, raise_errors=True):
+            yield token
+    
     async def batch_query(self, queries: List[str], top_k: int = 5) -> List[Dict[str, Any]]:
-        """Execute RAG pipeline for multiple queries"""
-        results = []
-        for query in queries:
-            result = await self.query(query, top_k)
-            results.append(result)
-        return results
+        """Execute RAG pipeline for multiple queries concurrently, preserving order"""
+        # Retrieve for all queries at once, then generate per query
+        retrieved_batches = await self.retrieve_batch(queries, top_k)
+        
+        # Bound in-flight generations to avoid LLM rate-limit spikes
+        semaphore = asyncio.Semaphore(settings.rag_concurrency or 16)
+        
+        async def bounded_query(query: str, retrieved_results: List[SearchResult]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.query(query, top_k, retrieved_results=retrieved_results)
+        
+        # query() turns failures into error results, so one bad query
+        # cannot abort the rest of the batch
+        return list(await asyncio.gather(*(
+            bounded_query(query, retrieved_results)
+            for query, retrieved_results in zip(queries, retrieved_batches)
+        )))
     
     async def get_index_stats(self) -> Dict[str, Any]:
         """Get statistics about the vector index"""
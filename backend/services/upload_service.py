@@ -9,12 +9,19 @@ from ..models.content import ContentType
 from ..utils.file_processor import process_document, process_image, process_audio, process_video
 from ..utils.embeddings import generate_embeddings
 from ..utils.database import save_content_metadata, update_processing_status
+from ..utils.query_cache import query_cache
 from ..services.pinecone_service import pinecone_service
 from ..logging import get_logger
 from ..logging.metrics import metrics_tracker
 
 logger = get_logger(__name__)
 
+
+def _remove_if_exists(file_path: str):
+    if os.path.exists(file_path):
+        os.remove(file_path)
+
+
 async def process_file_upload(
     file_id: str, 
     file_path: str, 
@@ -24,9 +31,11 @@ async def process_file_upload(
     """
     Process uploaded file based on its content type
     """
+    loop = asyncio.get_running_loop()
+    status_task = None
     try:
         # Log file upload
-        file_size = os.path.getsize(file_path)
+        file_size = await loop.run_in_executor(None, os.path.getsize, file_path)
         metrics_tracker.log_file_upload(
             filename=original_filename,
             file_size=file_size,
@@ -43,8 +52,8 @@ async def process_file_upload(
             }
         )
         
-        # Update status to processing
-        await update_processing_status(file_id, "processing")
+        # Update status to processing while the text is being extracted
+        status_task = asyncio.ensure_future(update_processing_status(file_id, "processing"))
         
         # Process file based on content type
         if content_type == ContentType.DOCUMENT:
@@ -66,22 +75,37 @@ async def process_file_upload(
             )
             raise ValueError(error_msg)
         
-        # Generate embeddings for the extracted text
+        # The processing status must land before the metadata row is written
+        await status_task
+        
+        # Generate embeddings and save metadata concurrently; let both stages
+        # finish before reporting a failure so no write lands after it
+        stages = [
+            save_content_metadata(
+                file_id=file_id,
+                filename=original_filename,
+                content_type=content_type,
+                size=file_size,
+                extracted_text_length=len(extracted_text) if extracted_text else 0
+            )
+        ]
         if extracted_text:
-            await generate_embeddings(file_id, extracted_text)
+            stages.append(generate_embeddings(file_id, extracted_text))
         
-        # Save metadata to database
-        await save_content_metadata(
-            file_id=file_id,
-            filename=original_filename,
-            content_type=content_type,
-            size=file_size,
-            extracted_text_length=len(extracted_text) if extracted_text else 0
-        )
+        results = await asyncio.gather(*stages, return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        # generate_embeddings reports failed Pinecone upserts rather than raising
+        if extracted_text and not results[1]:
+            raise RuntimeError("Failed to upsert some embeddings to Pinecone")
         
         # Update status to completed
         await update_processing_status(file_id, "completed")
         
+        # New content can change answers to previously cached queries
+        query_cache.clear()
+        
         logger.info(
             f"File processing completed successfully",
             extra={
@@ -93,7 +117,9 @@ async def process_file_upload(
         )
         
     except Exception as e:
-        # Update status to failed
+        # Update status to failed, after any in-flight "processing" update
+        if status_task is not None:
+            await asyncio.gather(status_task, return_exceptions=True)
         await update_processing_status(file_id, "failed", error=str(e))
         
         # Log the error
@@ -122,5 +148,4 @@ async def process_file_upload(
         raise e
     finally:
         # Clean up temporary file
-        if os.path.exists(file_path):
-            os.remove(file_path)
\ No newline at end of file
+        await loop.run_in_executor(None, _remove_if_exists, file_path)
\ No newline at end of file
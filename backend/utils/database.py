@@ -1,48 +1,180 @@
 import asyncio
 import aiosqlite
-import json
-from typing import List, Dict, Any, Optional
+import orjson
+import numpy as np
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 from datetime import datetime
 import os
 
+from ..config import settings
 from ..models.content import ProcessingStatus
+from .query_cache import metadata_cache
+from .vector_index import embedding_index
 
 
 # Database file path
 DB_PATH = "multi_modal_content.db"
 
+# Applied once when the shared connection is opened
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",  # 64MB page cache
+    "PRAGMA mmap_size=268435456",  # 256MB memory-mapped I/O
+    "PRAGMA foreign_keys=ON",
+)
+
+_EMBEDDINGS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        file_id TEXT REFERENCES content(file_id) ON DELETE CASCADE,
+        chunk_text TEXT,
+        embedding BLOB,  -- raw float32 bytes
+        created_at TEXT
+    )
+'''
+
+# Columns update_content_metadata may set
+_UPDATABLE_COLUMNS = frozenset({
+    'filename', 'content_type', 'size', 'processing_status',
+    'extracted_text_length', 'embedding_status', 'tags', 'metadata'
+})
+
+
+class AsyncSQLitePool:
+    """
+    One writer connection plus a queue of read-only connections.
+
+    WAL lets readers run concurrently with each other and with the writer,
+    so SELECTs no longer queue behind writes; writes are serialized on the
+    single writer connection.
+    """
+
+    def __init__(self, path: str, readers: int = 8):
+        self.path = path
+        self.readers = readers
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._write_lock: Optional[asyncio.Lock] = None
+        self._readers: Optional[asyncio.Queue] = None
+        self._connections: List[aiosqlite.Connection] = []
+
+    async def _connect(self, *pragmas: str) -> aiosqlite.Connection:
+        db = await aiosqlite.connect(self.path)
+        for pragma in _PRAGMAS + pragmas:
+            await db.execute(pragma)
+        self._connections.append(db)
+        return db
+
+    async def open(self):
+        """Open the writer, create the tables, then open the readers"""
+        self._writer = await self._connect()
+        await _create_tables(self._writer)
+        self._write_lock = asyncio.Lock()
+
+        self._readers = asyncio.Queue()
+        for _ in range(self.readers):
+            self._readers.put_nowait(await self._connect("PRAGMA query_only=1"))
+
+    @asynccontextmanager
+    async def reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Borrow a read-only connection"""
+        db = await self._readers.get()
+        try:
+            yield db
+        finally:
+            self._readers.put_nowait(db)
+
+    @asynccontextmanager
+    async def writer(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Hold the writer connection for one write transaction"""
+        async with self._write_lock:
+            yield self._writer
+
+    async def close(self):
+        """Close every connection"""
+        for db in self._connections:
+            await db.close()
+        self._connections.clear()
+
+
+_pool: Optional[AsyncSQLitePool] = None
+_pool_lock: Optional[asyncio.Lock] = None
+
+
+async def get_pool() -> AsyncSQLitePool:
+    """
+    Shared connection pool, opened and initialized on first use so requests
+    do not pay for a new connection and its worker thread each time
+    """
+    global _pool, _pool_lock
+    if _pool is not None:
+        return _pool
+    
+    # Created lazily so the lock binds to the running event loop
+    if _pool_lock is None:
+        _pool_lock = asyncio.Lock()
+    
+    async with _pool_lock:
+        if _pool is None:
+            pool = AsyncSQLitePool(DB_PATH, readers=settings.sqlite_read_pool_size)
+            await pool.open()
+            _pool = pool
+    return _pool
+
+
+async def close_db():
+    """Close the shared connection pool"""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
 
 async def init_db():
     """Initialize the database with required tables"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        # Create content table
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS content (
-                file_id TEXT PRIMARY KEY,
-                filename TEXT NOT NULL,
-                content_type TEXT NOT NULL,
-                size INTEGER,
-                upload_time TEXT,
-                processing_status TEXT DEFAULT 'pending',
-                extracted_text_length INTEGER,
-                embedding_status BOOLEAN DEFAULT FALSE,
-                tags TEXT,
-                metadata TEXT
-            )
-        ''')
-        
-        # Create embeddings table
+    await get_pool()
+
+
+async def _create_tables(db: aiosqlite.Connection):
+    # Create content table
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS content (
+            file_id TEXT PRIMARY KEY,
+            filename TEXT NOT NULL,
+            content_type TEXT NOT NULL,
+            size INTEGER,
+            upload_time TEXT,
+            processing_status TEXT DEFAULT 'pending',
+            extracted_text_length INTEGER,
+            embedding_status BOOLEAN DEFAULT FALSE,
+            tags TEXT,
+            metadata TEXT
+        )
+    ''')
+    
+    # Create embeddings table
+    await db.execute(_EMBEDDINGS_TABLE.format(name='embeddings'))
+    
+    # Tables created before file_id referenced content are rebuilt with the
+    # foreign key; rows of already deleted content are dropped
+    async with db.execute('PRAGMA foreign_key_list(embeddings)') as cursor:
+        has_foreign_key = await cursor.fetchone() is not None
+    if not has_foreign_key:
+        await db.execute(_EMBEDDINGS_TABLE.format(name='embeddings_new'))
         await db.execute('''
-            CREATE TABLE IF NOT EXISTS embeddings (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                file_id TEXT,
-                chunk_text TEXT,
-                embedding BLOB,
-                created_at TEXT
-            )
+            INSERT INTO embeddings_new
+            SELECT * FROM embeddings
+            WHERE file_id IN (SELECT file_id FROM content)
         ''')
-        
-        await db.commit()
+        await db.execute('DROP TABLE embeddings')
+        await db.execute('ALTER TABLE embeddings_new RENAME TO embeddings')
+    
+    await db.execute('CREATE INDEX IF NOT EXISTS idx_embeddings_file_id ON embeddings(file_id)')
+    await db.execute('CREATE INDEX IF NOT EXISTS idx_content_upload_time ON content(upload_time DESC)')
+    
+    await db.commit()
 
 
 async def save_content_metadata(
@@ -53,13 +185,20 @@ async def save_content_metadata(
     extracted_text_length: int = 0
 ):
     """Save content metadata to database"""
-    await init_db()  # Ensure DB is initialized
-    
-    async with aiosqlite.connect(DB_PATH) as db:
+    pool = await get_pool()
+    async with pool.writer() as db:
         await db.execute('''
-            INSERT OR REPLACE INTO content 
+            INSERT INTO content 
             (file_id, filename, content_type, size, upload_time, processing_status, extracted_text_length, metadata)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(file_id) DO UPDATE SET
+                filename = excluded.filename,
+                content_type = excluded.content_type,
+                size = excluded.size,
+                upload_time = excluded.upload_time,
+                processing_status = excluded.processing_status,
+                extracted_text_length = excluded.extracted_text_length,
+                metadata = excluded.metadata
         ''', (
             file_id, 
             filename, 
@@ -68,29 +207,31 @@ async def save_content_metadata(
             datetime.utcnow().isoformat(), 
             'completed', 
             extracted_text_length,
-            json.dumps({})
+            orjson.dumps({}).decode()
         ))
         await db.commit()
+        metadata_cache.clear()
 
 
 async def get_content_metadata(file_id: str) -> Optional[Dict[str, Any]]:
     """Retrieve content metadata from database"""
-    async with aiosqlite.connect(DB_PATH) as db:
+    pool = await get_pool()
+    async with pool.reader() as db:
         async with db.execute(
             'SELECT * FROM content WHERE file_id = ?', (file_id,)
         ) as cursor:
             row = await cursor.fetchone()
-            
+        
             if row:
                 columns = [description[0] for description in cursor.description]
                 result = dict(zip(columns, row))
-                
+            
                 # Parse JSON fields
                 if result['metadata']:
-                    result['metadata'] = json.loads(result['metadata'])
+                    result['metadata'] = orjson.loads(result['metadata'])
                 if result['tags']:
-                    result['tags'] = json.loads(result['tags'])
-                
+                    result['tags'] = orjson.loads(result['tags'])
+            
                 return result
             else:
                 return None
@@ -98,158 +239,213 @@ async def get_content_metadata(file_id: str) -> Optional[Dict[str, Any]]:
 
 async def update_processing_status(file_id: str, status: str, error: str = None):
     """Update the processing status of a file"""
-    async with aiosqlite.connect(DB_PATH) as db:
+    pool = await get_pool()
+    async with pool.writer() as db:
         # Prepare metadata update
         metadata = {}
         if error:
             metadata['error'] = error
-        
+    
         await db.execute('''
             UPDATE content 
             SET processing_status = ?, metadata = ?
             WHERE file_id = ?
-        ''', (status, json.dumps(metadata), file_id))
+        ''', (status, orjson.dumps(metadata).decode(), file_id))
         await db.commit()
+        metadata_cache.clear()
+
+
+def _encode_embedding(embedding) -> bytes:
+    """Raw float32 bytes, a quarter of the size of the JSON text"""
+    return np.asarray(embedding, dtype=np.float32).tobytes()
+
+
+def _decode_embedding(value) -> np.ndarray:
+    """Read-only float32 view over a stored embedding"""
+    if isinstance(value, str):
+        # Rows written before embeddings were stored as BLOBs
+        return np.asarray(orjson.loads(value), dtype=np.float32)
+    return np.frombuffer(value, dtype=np.float32)
 
 
 async def save_embedding(file_id: str, chunk_text: str, embedding: List[float]):
     """Save embedding to database"""
-    await init_db()  # Ensure DB is initialized
-    
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute('''
+    await save_embeddings_batch(file_id, [(chunk_text, embedding)])
+
+
+async def save_embeddings_batch(file_id: str, chunks: List[Tuple[str, List[float]]]):
+    """Save a file's (chunk_text, embedding) pairs in a single transaction"""
+    if not chunks:
+        return
+
+    now = datetime.utcnow().isoformat()
+    params = [
+        (file_id, chunk_text, _encode_embedding(embedding), now)
+        for chunk_text, embedding in chunks
+    ]
+
+    pool = await get_pool()
+    async with pool.writer() as db:
+        await db.executemany('''
             INSERT INTO embeddings (file_id, chunk_text, embedding, created_at)
             VALUES (?, ?, ?, ?)
-        ''', (
-            file_id,
-            chunk_text,
-            json.dumps(embedding),  # Store as JSON string
-            datetime.utcnow().isoformat()
-        ))
+        ''', params)
         await db.commit()
+    embedding_index.mark_appended()
 
 
 async def get_embedding(embedding_id: int) -> Optional[Dict[str, Any]]:
     """Retrieve embedding from database"""
-    async with aiosqlite.connect(DB_PATH) as db:
+    pool = await get_pool()
+    async with pool.reader() as db:
         async with db.execute(
             'SELECT * FROM embeddings WHERE id = ?', (embedding_id,)
         ) as cursor:
             row = await cursor.fetchone()
-            
+        
             if row:
                 columns = [description[0] for description in cursor.description]
                 result = dict(zip(columns, row))
-                
-                # Parse embedding from JSON
+            
                 if result['embedding']:
-                    result['embedding'] = json.loads(result['embedding'])
-                
+                    result['embedding'] = _decode_embedding(result['embedding'])
+            
                 return result
             else:
                 return None
 
 
+async def _load_embeddings(pool: AsyncSQLitePool, dim: int, after_id: int = 0) -> Tuple[List[int], List[np.ndarray]]:
+    """Stored vectors of the given dimension with row id above after_id, in id order"""
+    async with pool.reader() as db:
+        async with db.execute(
+            'SELECT id, embedding FROM embeddings WHERE id > ? ORDER BY id', (after_id,)
+        ) as cursor:
+            rows = await cursor.fetchall()
+    
+    ids, vectors = [], []
+    for row_id, value in rows:
+        if not value:
+            continue
+        vector = _decode_embedding(value)
+        if vector.size == dim:
+            ids.append(row_id)
+            vectors.append(vector)
+    return ids, vectors
+
+
 async def search_embeddings(query_embedding: List[float], top_k: int = 5) -> List[Dict[str, Any]]:
-    """Search for similar embeddings (simplified - in real implementation would use vector search)"""
-    # Note: This is a simplified implementation
-    # In a real system, you would use a proper vector database like Weaviate, Pinecone, or FAISS
-    async with aiosqlite.connect(DB_PATH) as db:
+    """
+    Return the top_k stored embeddings by cosine similarity to the query,
+    each with its 'score', via the in-process FAISS index
+    """
+    query = np.asarray(query_embedding, dtype=np.float32)
+    loop = asyncio.get_running_loop()
+    pool = await get_pool()
+    
+    if embedding_index.needs_build(query.size):
+        version, appends = embedding_index.version, embedding_index.appends
+        ids, vectors = await _load_embeddings(pool, query.size)
+        await loop.run_in_executor(
+            None, embedding_index.build, ids, vectors, query.size, version, appends
+        )
+    elif embedding_index.needs_sync():
+        # Only rows inserted since the last sync are read and added
+        appends = embedding_index.appends
+        ids, vectors = await _load_embeddings(pool, query.size, embedding_index.max_id)
+        await loop.run_in_executor(None, embedding_index.add, ids, vectors, appends)
+    
+    hits = await loop.run_in_executor(None, embedding_index.search, query, top_k)
+    if not hits:
+        return []
+    
+    placeholders = ",".join("?" * len(hits))
+    async with pool.reader() as db:
         async with db.execute(
-            'SELECT * FROM embeddings LIMIT ?', (top_k,)
+            f'SELECT * FROM embeddings WHERE id IN ({placeholders})',
+            [row_id for row_id, _ in hits]
         ) as cursor:
             rows = await cursor.fetchall()
-            
-            results = []
             columns = [description[0] for description in cursor.description]
-            
-            for row in rows:
-                result = dict(zip(columns, row))
-                
-                # Parse embedding from JSON
-                if result['embedding']:
-                    result['embedding'] = json.loads(result['embedding'])
-                
-                results.append(result)
-            
-            return results
+    
+    by_id = {}
+    for row in rows:
+        result = dict(zip(columns, row))
+        if result['embedding']:
+            result['embedding'] = _decode_embedding(result['embedding'])
+        by_id[result['id']] = result
+    
+    results = []
+    for row_id, score in hits:
+        # Rows deleted since the index was built are skipped
+        result = by_id.get(row_id)
+        if result is not None:
+            result['score'] = score
+            results.append(result)
+    return results
 
 
 async def update_content_metadata(file_id: str, updates: Dict[str, Any]) -> bool:
     """Update content metadata"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        # Get existing metadata
-        metadata = await get_content_metadata(file_id)
-        if not metadata:
-            return False
-        
-        # Update with new values
-        for key, value in updates.items():
-            if key in ['tags', 'metadata']:
-                # Handle JSON fields
-                if isinstance(value, (dict, list)):
-                    metadata[key] = json.dumps(value)
-                else:
-                    metadata[key] = value
-            else:
-                metadata[key] = value
-        
-        # Update the database
-        await db.execute('''
-            UPDATE content 
-            SET filename = ?, content_type = ?, size = ?, processing_status = ?, 
-                extracted_text_length = ?, embedding_status = ?, tags = ?, metadata = ?
-            WHERE file_id = ?
-        ''', (
-            metadata.get('filename'),
-            metadata.get('content_type'),
-            metadata.get('size'),
-            metadata.get('processing_status'),
-            metadata.get('extracted_text_length'),
-            metadata.get('embedding_status'),
-            metadata.get('tags'),
-            metadata.get('metadata'),
-            file_id
-        ))
+    # Only known columns are written; the names are interpolated into the SQL
+    updates = {key: value for key, value in updates.items() if key in _UPDATABLE_COLUMNS}
+    if not updates:
+        return await get_content_metadata(file_id) is not None
+    
+    assignments = ", ".join(f"{key} = ?" for key in updates)
+    params = [
+        # Handle JSON fields
+        orjson.dumps(value).decode() if key in ('tags', 'metadata') and isinstance(value, (dict, list)) else value
+        for key, value in updates.items()
+    ]
+    
+    pool = await get_pool()
+    async with pool.writer() as db:
+        cursor = await db.execute(
+            f'UPDATE content SET {assignments} WHERE file_id = ?',
+            (*params, file_id)
+        )
         await db.commit()
-        return True
+        metadata_cache.clear()
+        return cursor.rowcount > 0
 
 
 async def list_all_content(limit: int = 100, offset: int = 0) -> list:
     """List all content with pagination"""
-    async with aiosqlite.connect(DB_PATH) as db:
+    pool = await get_pool()
+    async with pool.reader() as db:
         async with db.execute(
             'SELECT * FROM content ORDER BY upload_time DESC LIMIT ? OFFSET ?',
             (limit, offset)
         ) as cursor:
             rows = await cursor.fetchall()
             columns = [description[0] for description in cursor.description]
-            
+        
             results = []
             for row in rows:
                 result = dict(zip(columns, row))
-                
+            
                 # Parse JSON fields
                 if result['metadata']:
-                    result['metadata'] = json.loads(result['metadata'])
+                    result['metadata'] = orjson.loads(result['metadata'])
                 if result['tags']:
-                    result['tags'] = json.loads(result['tags'])
-                
-                results.append(result)
+                    result['tags'] = orjson.loads(result['tags'])
             
+                results.append(result)
+        
             return results
 
 
 async def delete_content(file_id: str) -> bool:
     """Delete content and its embeddings"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        # Delete embeddings first
-        await db.execute('DELETE FROM embeddings WHERE file_id = ?', (file_id,))
-        
-        # Delete content
+    pool = await get_pool()
+    async with pool.writer() as db:
+        # Embeddings go with it through ON DELETE CASCADE
         cursor = await db.execute('DELETE FROM content WHERE file_id = ?', (file_id,))
         await db.commit()
-        
+        metadata_cache.clear()
+        embedding_index.mark_stale()
+    
         return cursor.rowcount > 0
 
 
@@ -261,29 +457,26 @@ async def get_content_by_ids(file_ids: List[str]) -> List[Dict[str, Any]]:
     placeholders = ",".join("?" * len(file_ids))
     query = f"SELECT * FROM content WHERE file_id IN ({placeholders})"
     
-    async with aiosqlite.connect(DB_PATH) as db:
+    pool = await get_pool()
+    async with pool.reader() as db:
         async with db.execute(query, file_ids) as cursor:
             rows = await cursor.fetchall()
-            
+        
             if not rows:
                 return []
-            
+        
             columns = [description[0] for description in cursor.description]
             results = []
-            
+        
             for row in rows:
                 result = dict(zip(columns, row))
-                
+            
                 # Parse JSON fields
                 if result["metadata"]:
-                    result["metadata"] = json.loads(result["metadata"])
+                    result["metadata"] = orjson.loads(result["metadata"])
                 if result["tags"]:
-                    result["tags"] = json.loads(result["tags"])
-                
-                results.append(result)
+                    result["tags"] = orjson.loads(result["tags"])
             
+                results.append(result)
+        
             return results
-
-
-# Initialize the database when module is loaded
-asyncio.create_task(init_db())
\ No newline at end of file
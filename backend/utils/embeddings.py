@@ -1,6 +1,8 @@
 import asyncio
+import re
+from collections import OrderedDict
 import numpy as np
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import os
 from datetime import datetime
 
@@ -8,12 +10,25 @@ from ..models.content import SearchResult
 from ..config import settings
 from ..utils.database import save_embedding, get_embedding, search_embeddings
 from ..services.pinecone_service import pinecone_service
+from .llm_client import get_embeddings
+from .lexical_index import lexical_index
+from .rerank import chunk_reranker
+
+try:
+    from numba import njit
+except ImportError:
+    # Without Numba the chunk boundary loop runs as plain Python
+    def njit(*args, **kwargs):
+        return lambda func: func
 
 
 class EmbeddingService:
     def __init__(self):
         # Model initialization will be handled based on provider
         self.model = None
+        # LRU of query embeddings keyed on (provider, model, query)
+        self._query_embedding_cache: "OrderedDict[tuple, List[float]]" = OrderedDict()
+        self.query_embedding_cache_size = settings.query_embedding_cache_size
         
     async def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
         """Generate embeddings for a list of texts based on configured provider"""
@@ -28,12 +43,8 @@ class EmbeddingService:
                 embeddings.append(dummy_embedding)
             return embeddings
         elif settings.embedding_provider == "openai":
-            # Placeholder for OpenAI embeddings
-            embeddings = []
-            for text in texts:
-                dummy_embedding = [0.1] * settings.embedding_dimension
-                embeddings.append(dummy_embedding)
-            return embeddings
+            # One /embeddings request per batch of inputs, all batches in flight at once
+            return await get_embeddings(texts, settings.embedding_model, settings.embedding_batch_size)
         else:
             # Default fallback
             embeddings = []
@@ -42,6 +53,35 @@ class EmbeddingService:
                 embeddings.append(dummy_embedding)
             return embeddings
     
+    async def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embed search queries, reusing cached vectors and embedding all misses in one call"""
+        model_key = (settings.embedding_provider, settings.embedding_model)
+        cache = self._query_embedding_cache
+        
+        embeddings: List[Optional[List[float]]] = []
+        misses: Dict[str, None] = {}
+        for query in queries:
+            key = model_key + (query,)
+            embedding = cache.get(key)
+            if embedding is not None:
+                cache.move_to_end(key)
+            else:
+                misses[query] = None
+            embeddings.append(embedding)
+        
+        if misses:
+            new_embeddings = dict(zip(misses, await self.generate_embeddings(list(misses))))
+            for query, embedding in new_embeddings.items():
+                cache[model_key + (query,)] = embedding
+            while len(cache) > self.query_embedding_cache_size:
+                cache.popitem(last=False)
+            embeddings = [
+                embedding if embedding is not None else new_embeddings[query]
+                for query, embedding in zip(queries, embeddings)
+            ]
+        
+        return embeddings
+    
     async def add_embeddings_to_pinecone(self, file_id: str, texts: List[str]):
         """Add texts and embeddings to Pinecone"""
         # Generate embeddings for texts
@@ -57,57 +97,188 @@ class EmbeddingService:
                 'chunk_id': i
             })
         
-        # Upsert to Pinecone
+        # Upsert to Pinecone, and index the same chunks for lexical search
         success = await pinecone_service.upsert_embeddings(file_id, chunks)
+        if success:
+            lexical_index.add_chunks(file_id, chunks)
+            if settings.rerank_enabled:
+                chunk_reranker.add_chunks(file_id, chunks)
         return success
     
-    async def search_pinecone(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
-        """Search for similar texts in Pinecone"""
-        # Generate embedding for query
-        query_embeddings = await self.generate_embeddings([query])
-        query_embedding = query_embeddings[0]  # Get the first (and only) embedding
+    async def search_pinecone(
+        self,
+        query: str,
+        top_k: int = 5,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
+        """Search for similar texts in Pinecone, reusing a precomputed query embedding if given"""
+        if query_embedding is None:
+            query_embeddings = await self.embed_queries([query])
+            query_embedding = query_embeddings[0]  # Get the first (and only) embedding
         
         # Query Pinecone
         results = await pinecone_service.query_embeddings(query_embedding, top_k)
         
         return results
+    
+    async def search_pinecone_batch(self, queries: List[str], top_k: int = 5) -> List[List[Dict[str, Any]]]:
+        """Search Pinecone for several queries with one embedding call and parallel queries"""
+        query_embeddings = await self.embed_queries(queries)
+        return await pinecone_service.query_embeddings_batch(query_embeddings, top_k)
 
 
 # Global embedding service instance
 embedding_service = EmbeddingService()
 
 
-async def generate_embeddings(file_id: str, text: str, chunk_size: int = 512):
+# Bound on items buffered between ingestion pipeline stages
+PIPELINE_QUEUE_SIZE = 64
+
+
+# End of a sentence: terminal punctuation plus the whitespace after it
+_SENTENCE_END = re.compile(r'[.!?]+\s+')
+
+
+@njit(cache=True)
+def _chunk_boundaries(ends: np.ndarray, chunk_size: int) -> np.ndarray:
     """
-    Generate and store embeddings for text content in Pinecone
+    Greedily group sentences, given their end offsets, into chunks of at most
+    chunk_size characters (at least one sentence each); returns chunk ends
     """
-    # Split text into chunks
-    sentences = text.split('. ')
-    chunks = []
-    current_chunk = ""
-    
-    for sentence in sentences:
-        if len(current_chunk) + len(sentence) < chunk_size:
-            current_chunk += sentence + ". "
-        else:
-            if current_chunk.strip():
-                chunks.append(current_chunk.strip())
-            current_chunk = sentence + ". "
+    boundaries = np.empty(len(ends), dtype=np.int64)
+    count = 0
+    start = 0
+    first = 0
+    while start < ends[-1]:
+        # Furthest sentence end within chunk_size, but always at least one sentence
+        last = max(np.searchsorted(ends, start + chunk_size, side='right') - 1, first)
+        start = ends[last]
+        boundaries[count] = start
+        count += 1
+        first = last + 1
+    return boundaries[:count]
+
+
+def _chunk_ends(text: str, chunk_size: int) -> np.ndarray:
+    """End offsets of the sentence-aligned chunks of roughly chunk_size characters"""
+    # Sentence end offsets (the running sum of sentence lengths) in one regex pass;
+    # each chunk is then a single slice instead of repeated concatenation
+    ends = np.fromiter((match.end() for match in _SENTENCE_END.finditer(text)), dtype=np.int64)
+    return _chunk_boundaries(np.append(ends, len(text)), chunk_size)
+
+
+def _split_chunks(text: str, chunk_size: int, ends: Optional[np.ndarray] = None):
+    """Yield sentence-aligned chunks of roughly chunk_size characters"""
+    if ends is None:
+        ends = _chunk_ends(text, chunk_size)
+    start = 0
+    for end in ends.tolist():
+        chunk = text[start:end].strip()
+        if chunk:
+            yield chunk
+        start = end
+
+
+async def _chunk_producer(text: str, chunk_size: int, chunk_queue: asyncio.Queue):
+    """Pipeline stage 1: split the text and queue (chunk_id, text) items"""
+    # Boundaries are found off the event loop; slicing stays lazy so chunks
+    # stream into the bounded queue
+    loop = asyncio.get_running_loop()
+    ends = await loop.run_in_executor(None, _chunk_ends, text, chunk_size)
+    for chunk_id, chunk in enumerate(_split_chunks(text, chunk_size, ends)):
+        await chunk_queue.put((chunk_id, chunk))
+    await chunk_queue.put(None)
+
+
+async def _chunk_embedder(chunk_queue: asyncio.Queue, vector_queue: asyncio.Queue):
+    """Pipeline stage 2: embed queued chunks in batches and queue the vectors"""
+    done = False
+    while not done:
+        batch = [await chunk_queue.get()]
+        while len(batch) < settings.embedding_batch_size and not chunk_queue.empty():
+            batch.append(chunk_queue.get_nowait())
+        if batch[-1] is None:
+            batch.pop()
+            done = True
+        
+        if batch:
+            embeddings = await embedding_service.generate_embeddings([text for _, text in batch])
+            for (chunk_id, text), embedding in zip(batch, embeddings):
+                await vector_queue.put({
+                    'content': text,
+                    'embedding': embedding,
+                    'source_type': 'document',  # This would be dynamic in a full implementation
+                    'chunk_id': chunk_id
+                })
+    await vector_queue.put(None)
+
+
+async def _chunk_upserter(file_id: str, vector_queue: asyncio.Queue) -> bool:
+    """Pipeline stage 3: upsert queued vectors to Pinecone in batches"""
+    success = True
+    batch = []
+    while True:
+        chunk = await vector_queue.get()
+        if chunk is not None:
+            batch.append(chunk)
+        if batch and (chunk is None or len(batch) >= pinecone_service.upsert_batch_size):
+            if await pinecone_service.upsert_embeddings(file_id, batch):
+                lexical_index.add_chunks(file_id, batch)
+                if settings.rerank_enabled:
+                    chunk_reranker.add_chunks(file_id, batch)
+            else:
+                success = False
+            batch = []
+        if chunk is None:
+            return success
+
+
+async def generate_embeddings(file_id: str, text: str, chunk_size: int = 512) -> bool:
+    """
+    Generate and store embeddings for text content in Pinecone.
     
-    if current_chunk.strip():
-        chunks.append(current_chunk.strip())
+    Chunking, embedding and upserting run as a pipeline over bounded queues,
+    so Pinecone writes overlap with embedding the rest of the file.
+    """
+    chunk_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    vector_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
     
-    # Add chunks to Pinecone
-    if chunks:
-        await embedding_service.add_embeddings_to_pinecone(file_id, chunks)
+    stages = [
+        asyncio.ensure_future(_chunk_producer(text, chunk_size, chunk_queue)),
+        asyncio.ensure_future(_chunk_embedder(chunk_queue, vector_queue)),
+        asyncio.ensure_future(_chunk_upserter(file_id, vector_queue))
+    ]
+    try:
+        _, _, success = await asyncio.gather(*stages)
+        return success
+    finally:
+        # A failed stage would leave its neighbours blocked on a queue
+        for stage in stages:
+            stage.cancel()
 
 
-async def semantic_search(query: str, top_k: int = 5) -> List[SearchResult]:
+async def semantic_search(
+    query: str,
+    top_k: int = 5,
+    query_embedding: Optional[List[float]] = None
+) -> List[SearchResult]:
     """
     Perform semantic search using Pinecone embeddings
     """
-    results = await embedding_service.search_pinecone(query, top_k)
-    
+    results = await embedding_service.search_pinecone(query, top_k, query_embedding)
+    return _to_search_results(results)
+
+
+async def semantic_search_batch(queries: List[str], top_k: int = 5) -> List[List[SearchResult]]:
+    """
+    Perform semantic search for several queries, preserving input order
+    """
+    batch_results = await embedding_service.search_pinecone_batch(queries, top_k)
+    return [_to_search_results(results) for results in batch_results]
+
+
+def _to_search_results(results: List[Dict[str, Any]]) -> List[SearchResult]:
+    """Convert Pinecone matches to SearchResult models"""
     search_results = []
     for result in results:
         search_results.append(SearchResult(
@@ -1,15 +1,52 @@
 import asyncio
+import multiprocessing
 import os
-from typing import Optional
-import PyPDF2
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Optional, Tuple, Union
+import pypdfium2 as pdfium
 from PIL import Image
 import pytesseract
-from pdf2image import convert_from_path
-import whisper
+from faster_whisper import WhisperModel
+import ctranslate2
 import cv2
 from moviepy.editor import VideoFileClip
 import tempfile
 
+# Whisper model, loaded once per transcription worker process
+_whisper_model: Optional[WhisperModel] = None
+
+# Transcription and PDF work are CPU-bound, so they run in worker processes
+# rather than threads (PDFium is not thread-safe either)
+_transcribe_executor: Optional[ProcessPoolExecutor] = None
+_pdf_executor: Optional[ProcessPoolExecutor] = None
+
+# Render scale for OCR of scanned PDF pages (2 = 144 DPI)
+PDF_OCR_SCALE = 2
+
+# Seeking decodes from the preceding keyframe; for shorter gaps grabbing
+# (demuxing without decoding) through the skipped frames is cheaper
+FRAME_SEEK_MIN_GAP = 250
+
+
+async def _run_blocking(func, *args, **kwargs):
+    """Run a blocking library call in the default executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, partial(func, *args, **kwargs))
+
+
+def _spawn_executor(max_workers: int) -> ProcessPoolExecutor:
+    # Spawned rather than forked: CUDA cannot be re-initialized in a fork
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+def _read_text_file(file_path: str) -> str:
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return f.read()
+
 
 async def process_document(file_path: str) -> str:
     """
@@ -17,56 +54,83 @@ async def process_document(file_path: str) -> str:
     """
     _, ext = os.path.splitext(file_path.lower())
     
-    if ext == '.pdf':
-        return await extract_text_from_pdf(file_path)
-    elif ext in ['.doc', '.docx']:
-        return await extract_text_from_docx(file_path)
-    elif ext == '.txt':
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return f.read()
-    elif ext in ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']:
-        # For image files that might contain text
-        return await extract_text_from_image(file_path)
-    else:
-        # Try to read as text file
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
-        except UnicodeDecodeError:
-            # If it's not a text file, return empty string
-            return ""
+    handler = _DOCUMENT_HANDLERS.get(ext)
+    if handler is None:
+        # For image files that might contain text; otherwise try to read as text file
+        handler = extract_text_from_image if ext in _IMAGE_EXTENSIONS else _read_text_fallback
+    return await handler(file_path)
+
+
+async def _read_text(file_path: str) -> str:
+    return await _run_blocking(_read_text_file, file_path)
+
+
+async def _read_text_fallback(file_path: str) -> str:
+    try:
+        return await _read_text(file_path)
+    except UnicodeDecodeError:
+        # If it's not a text file, return empty string
+        return ""
 
 
 async def extract_text_from_pdf(file_path: str) -> str:
     """
-    Extract text from PDF file using PyPDF2 and OCR as fallback
+    Extract text from PDF file using PDFium, OCR-ing the pages in parallel
+    when there is no text layer
     """
-    text = ""
+    global _pdf_executor
+    if _pdf_executor is None:
+        _pdf_executor = _spawn_executor(int(os.getenv("PDF_WORKERS", str(os.cpu_count() or 1))))
+    loop = asyncio.get_running_loop()
     
     try:
         # Try to extract text directly from PDF
-        with open(file_path, 'rb') as f:
-            reader = PyPDF2.PdfReader(f)
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
-    except:
-        # If direct extraction fails, try OCR on images in PDF
-        try:
-            # Convert PDF to images
-            pages = convert_from_path(file_path)
-            for page in pages:
-                text += pytesseract.image_to_string(page) + "\n"
-        except:
-            # If all methods fail, return empty string
-            pass
+        text, page_count = await loop.run_in_executor(_pdf_executor, _sync_extract_pdf_text, file_path)
+    except Exception:
+        # If the document cannot be opened, there is nothing to OCR either
+        return ""
+    
+    if text.strip():
+        return text.strip()
     
-    return text.strip()
+    # Scanned PDF: render and OCR every page, one page per worker
+    try:
+        pages = await asyncio.gather(*(
+            loop.run_in_executor(_pdf_executor, _sync_ocr_pdf_page, file_path, index)
+            for index in range(page_count)
+        ))
+    except Exception:
+        # If all methods fail, return empty string
+        return ""
+    return "\n".join(pages).strip()
+
+
+def _sync_extract_pdf_text(file_path: str) -> Tuple[str, int]:
+    pdf = pdfium.PdfDocument(file_path)
+    try:
+        text = "\n".join(page.get_textpage().get_text_range() for page in pdf)
+        return text, len(pdf)
+    finally:
+        pdf.close()
+
+
+def _sync_ocr_pdf_page(file_path: str, index: int) -> str:
+    pdf = pdfium.PdfDocument(file_path)
+    try:
+        image = pdf[index].render(scale=PDF_OCR_SCALE).to_pil()
+        return pytesseract.image_to_string(image)
+    finally:
+        pdf.close()
 
 
 async def extract_text_from_docx(file_path: str) -> str:
     """
     Extract text from DOCX file
     """
+    return await _run_blocking(_sync_extract_docx, file_path)
+
+
+def _sync_extract_docx(file_path: str) -> str:
     try:
         import docx
         doc = docx.Document(file_path)
@@ -77,18 +141,32 @@ async def extract_text_from_docx(file_path: str) -> str:
         return ""
 
 
-async def process_image(file_path: str) -> str:
+async def extract_text_from_image(image: Union[str, Image.Image]) -> str:
+    """
+    Extract text from an image file or an in-memory PIL image using OCR
+    """
+    return await _run_blocking(_sync_ocr_image, image)
+
+
+def _sync_ocr_image(image: Union[str, Image.Image]) -> str:
+    if isinstance(image, Image.Image):
+        return pytesseract.image_to_string(image)
+    with Image.open(image) as opened:
+        return pytesseract.image_to_string(opened)
+
+
+async def process_image(image: Union[str, Image.Image]) -> str:
     """
-    Process image files and extract text using OCR and BLIP-2 vision-language model
+    Process image files (or in-memory PIL images) and extract text using OCR
+    and BLIP-2 vision-language model
     """
     try:
-        # Extract text using OCR
-        image = Image.open(file_path)
-        ocr_text = pytesseract.image_to_string(image)
-        
-        # Use BLIP-2 for image understanding and description
+        # Extract text using OCR, alongside the BLIP-2 caption
         from ..services.blip2_service import blip2_service
-        caption = blip2_service.generate_caption(file_path)
+        ocr_text, caption = await asyncio.gather(
+            extract_text_from_image(image),
+            blip2_service.generate_caption_async(image)
+        )
         
         # Combine OCR text and BLIP-2 caption
         if ocr_text.strip():
@@ -105,15 +183,29 @@ async def process_audio(file_path: str) -> str:
     """
     Process audio files and extract text using speech-to-text
     """
+    global _transcribe_executor
     try:
         # Use Whisper for speech-to-text
-        model = whisper.load_model("base")
-        result = model.transcribe(file_path)
-        return result["text"]
+        if _transcribe_executor is None:
+            _transcribe_executor = _spawn_executor(int(os.getenv("WHISPER_WORKERS", "2")))
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_transcribe_executor, _sync_transcribe, file_path)
     except Exception as e:
         return f"Error processing audio: {str(e)}"
 
 
+def _sync_transcribe(file_path: str) -> str:
+    global _whisper_model
+    if _whisper_model is None:
+        # CTranslate2 int8 kernels; weights stay int8 with fp16 activations on GPU
+        compute_type = "int8_float16" if ctranslate2.get_cuda_device_count() else "int8"
+        _whisper_model = WhisperModel("base", device="auto", compute_type=compute_type)
+    
+    # VAD skips silent stretches instead of decoding them
+    segments, _ = _whisper_model.transcribe(file_path, beam_size=1, vad_filter=True)
+    return " ".join(segment.text.strip() for segment in segments)
+
+
 async def process_video(file_path: str) -> str:
     """
     Process video files by extracting audio and frames
@@ -121,50 +213,77 @@ async def process_video(file_path: str) -> str:
     text_content = []
     
     try:
-        # Extract audio from video and process it
-        video = VideoFileClip(file_path)
-        audio = video.audio
-        
-        # Save audio temporarily
-        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_audio:
-            audio.write_audiofile(temp_audio.name, verbose=False, logger=None)
+        # Extract audio from video to a temp file and process it
+        fd, audio_path = tempfile.mkstemp(suffix='.wav')
+        os.close(fd)
+        try:
+            await _run_blocking(_sync_extract_audio, file_path, audio_path)
             
             # Process the extracted audio
-            audio_text = await process_audio(temp_audio.name)
+            audio_text = await process_audio(audio_path)
             if audio_text:
                 text_content.append(f"Audio transcript: {audio_text}")
-            
+        finally:
             # Clean up temp file
-            os.unlink(temp_audio.name)
-        
-        # Extract frames for OCR if needed
-        cap = cv2.VideoCapture(file_path)
-        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        fps = cap.get(cv2.CAP_PROP_FPS)
+            os.unlink(audio_path)
         
-        # Extract text from every 30 seconds of video (as an example)
-        interval = int(fps * 30)  # Every 30 seconds
-        
-        for i in range(0, frame_count, interval):
-            cap.set(cv2.CAP_PROP_POS_FRAMES, i)
-            ret, frame = cap.read()
-            if ret:
-                # Convert frame to image and run OCR
-                pil_image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        # Extract frames for OCR if needed, straight from memory
+        cap = await _run_blocking(cv2.VideoCapture, file_path)
+        try:
+            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            
+            # Extract text from every 30 seconds of video (as an example)
+            interval = int(fps * 30)  # Every 30 seconds
+            
+            previous = -1
+            for i in range(0, frame_count, interval):
+                image = await _run_blocking(_sync_read_frame, cap, i, previous)
+                previous = i
+                if image is None:
+                    continue
                 
-                # Save frame temporarily for OCR
-                with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as temp_frame:
-                    pil_image.save(temp_frame.name)
-                    frame_text = await process_image(temp_frame.name)
-                    
-                    if frame_text and "no text detected" not in frame_text.lower():
-                        text_content.append(f"Frame at {i//fps:.1f}s: {frame_text}")
-                    
-                    os.unlink(temp_frame.name)
-        
-        cap.release()
+                frame_text = await process_image(image)
+                if frame_text and "no text detected" not in frame_text.lower():
+                    text_content.append(f"Frame at {i//fps:.1f}s: {frame_text}")
+        finally:
+            cap.release()
         
         return "\n\n".join(text_content) if text_content else "No text extracted from video"
         
     except Exception as e:
-        return f"Error processing video: {str(e)}"
\ No newline at end of file
+        return f"Error processing video: {str(e)}"
+
+
+def _sync_extract_audio(file_path: str, audio_path: str):
+    video = VideoFileClip(file_path)
+    try:
+        video.audio.write_audiofile(audio_path, verbose=False, logger=None)
+    finally:
+        video.close()
+
+
+def _sync_read_frame(cap, index: int, previous: int) -> Optional[Image.Image]:
+    """Read frame `index` as an RGB PIL image, given the last frame read"""
+    gap = index - previous - 1
+    if gap > FRAME_SEEK_MIN_GAP:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+    else:
+        for _ in range(gap):
+            cap.grab()
+    
+    ret, frame = cap.read()
+    if not ret:
+        return None
+    return Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+
+
+# Document extractors by file extension, used by process_document
+_DOCUMENT_HANDLERS = {
+    '.pdf': extract_text_from_pdf,
+    '.doc': extract_text_from_docx,
+    '.docx': extract_text_from_docx,
+    '.txt': _read_text,
+}
+
+_IMAGE_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.bmp', '.tiff'})
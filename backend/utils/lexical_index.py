@@ -0,0 +1,123 @@
+import asyncio
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from rank_bm25 import BM25Okapi
+
+from ..models.content import SearchResult
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+# Constant from the original Reciprocal Rank Fusion paper
+RRF_K = 60
+
+
+def _tokenize(text: str) -> List[str]:
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class LexicalIndex:
+    """
+    In-memory BM25 index over the content chunks sent to Pinecone.
+
+    Chunks are added as files are embedded; the BM25 model is rebuilt lazily
+    on the first search after the corpus changed.
+    """
+
+    def __init__(self):
+        self._chunks: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        self._keys: List[Tuple[str, int]] = []
+        self._bm25: Optional[BM25Okapi] = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def add_chunks(self, file_id: str, chunks: List[Dict[str, Any]]):
+        """Index a file's chunks, keyed like their Pinecone vectors"""
+        with self._lock:
+            for chunk in chunks:
+                self._chunks[(file_id, chunk['chunk_id'])] = {
+                    'content': chunk['content'],
+                    'source_type': chunk.get('source_type') or 'document',
+                    'page_number': chunk.get('page_number')
+                }
+            self._dirty = True
+
+    def remove_file(self, file_id: str):
+        """Drop every chunk of a file"""
+        with self._lock:
+            for key in [key for key in self._chunks if key[0] == file_id]:
+                del self._chunks[key]
+            self._dirty = True
+
+    def search(self, query: str, top_k: int = 5) -> List[SearchResult]:
+        """Return the top_k chunks by BM25 score (blocking)"""
+        with self._lock:
+            if self._dirty:
+                self._keys = list(self._chunks)
+                self._bm25 = BM25Okapi(
+                    [_tokenize(self._chunks[key]['content']) for key in self._keys]
+                ) if self._keys else None
+                self._dirty = False
+
+            tokens = _tokenize(query)
+            if self._bm25 is None or not tokens:
+                return []
+
+            scores = self._bm25.get_scores(tokens)
+            ranked = sorted(range(len(self._keys)), key=scores.__getitem__, reverse=True)[:top_k]
+
+            results = []
+            for i in ranked:
+                if scores[i] <= 0:
+                    break
+                file_id, chunk_id = self._keys[i]
+                chunk = self._chunks[(file_id, chunk_id)]
+                results.append(SearchResult(
+                    content=chunk['content'],
+                    score=float(scores[i]),
+                    source={
+                        'file_id': file_id,
+                        'chunk_id': chunk_id,
+                        'source_type': chunk['source_type'],
+                        'page_number': chunk['page_number']
+                    },
+                    chunk_id=chunk_id
+                ))
+            return results
+
+    async def search_async(self, query: str, top_k: int = 5) -> List[SearchResult]:
+        """Run search in the default executor so scoring does not block the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.search, query, top_k)
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+
+def reciprocal_rank_fusion(result_lists: List[List[SearchResult]], top_k: int = 5) -> List[SearchResult]:
+    """
+    Merge ranked result lists with Reciprocal Rank Fusion, scoring each chunk
+    by sum(1 / (RRF_K + rank)) over the lists it appears in
+    """
+    fused: Dict[Tuple[Any, Any], List] = {}
+    for results in result_lists:
+        for rank, result in enumerate(results, start=1):
+            key = (result.source.get('file_id'), result.source.get('chunk_id'))
+            entry = fused.setdefault(key, [0.0, result])
+            entry[0] += 1.0 / (RRF_K + rank)
+
+    ranked = sorted(fused.values(), key=lambda entry: entry[0], reverse=True)[:top_k]
+    return [
+        SearchResult(
+            content=result.content,
+            score=score,
+            source=result.source,
+            chunk_id=result.chunk_id
+        )
+        for score, result in ranked
+    ]
+
+
+# Global lexical index instance
+lexical_index = LexicalIndex()
@@ -1,59 +1,162 @@
 import asyncio
-import openai
-from typing import Optional
+import base64
+import os
+import httpx
+import numpy as np
+from openai import AsyncOpenAI
+from typing import AsyncIterator, List, Optional
 from ..config import settings
 
 
-async def get_llm_response(
-    query: str, 
-    context: str = "", 
-    model: str = "gpt-4-turbo",
-    max_tokens: int = 1000,
-    temperature: float = 0.7
-) -> str:
+SYSTEM_PROMPT = "You are a helpful AI assistant that answers questions based on provided context."
+
+_client: Optional[AsyncOpenAI] = None
+_session_warmed = False
+
+
+def get_client() -> AsyncOpenAI:
     """
-    Get response from LLM with context
+    Shared chat and embeddings client backed by a keep-alive connection pool,
+    so concurrent calls reuse connections instead of paying TCP/TLS setup per call
     """
-    # Set API key from settings
-    if settings.openai_api_key:
-        openai.api_key = settings.openai_api_key
-    else:
-        # Fallback to environment variable
-        import os
-        openai.api_key = os.getenv("OPENAI_API_KEY")
-    
-    # Construct the prompt with context
+    global _client
+    if _client is None:
+        _client = AsyncOpenAI(
+            api_key=settings.openai_api_key or os.getenv("OPENAI_API_KEY"),
+            base_url=settings.llm_base_url,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_keepalive_connections=64, max_connections=256),
+                timeout=60
+            )
+        )
+    return _client
+
+
+async def ensure_session(model: Optional[str] = None):
+    """
+    Open a pooled connection to the LLM endpoint with a cheap authenticated
+    GET, so the first completion request skips TCP/TLS setup
+    """
+    global _session_warmed
+    if _session_warmed:
+        return
+    _session_warmed = True
+    try:
+        await get_client().models.retrieve(model or settings.default_llm_model)
+    except Exception:
+        # Best effort: the connection is pooled even if the lookup fails
+        pass
+
+
+async def close_client():
+    """Close the shared client's connection pool"""
+    global _client, _session_warmed
+    if _client is not None:
+        await _client.close()
+        _client = None
+    _session_warmed = False
+
+
+def _build_messages(query: str, context: str = "") -> list:
+    """
+    Chat messages for a query with optional context
+    """
+    # Construct the prompt with context. Static instructions go first and the
+    # per-request context and question last, so backends with prefix caching
+    # can reuse the KV cache for the shared prefix across calls.
     if context:
         prompt = f"""
+        Please provide a comprehensive answer based on the provided context. 
+        If the context doesn't contain relevant information, please indicate so.
+        
         Context: {context}
         
         Question: {query}
-        
-        Please provide a comprehensive answer based on the provided context. 
-        If the context doesn't contain relevant information, please indicate so.
         """
     else:
         prompt = query
     
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def _request_options() -> dict:
+    """
+    Extra request options for the configured LLM backend
+    """
+    request_options = {}
+    if settings.llm_cache_prompt:
+        # Honoured by self-hosted OpenAI-compatible servers with prefix caching
+        request_options["extra_body"] = {"cache_prompt": True}
+    return request_options
+
+
+async def get_llm_response(
+    query: str, 
+    context: str = "", 
+    model: str = "gpt-4-turbo",
+    max_tokens: int = 1000,
+    temperature: float = 0.7,
+    raise_errors: bool = False
+) -> str:
+    """
+    Get response from LLM with context. Failures come back as a fallback
+    message unless raise_errors is set, for callers that must tell them apart
+    """
     try:
         # Use OpenAI API to get response
-        response = await openai.ChatCompletion.acreate(
+        response = await get_client().chat.completions.create(
             model=model,
-            messages=[
-                {"role": "system", "content": "You are a helpful AI assistant that answers questions based on provided context."},
-                {"role": "user", "content": prompt}
-            ],
+            messages=_build_messages(query, context),
             max_tokens=max_tokens,
-            temperature=temperature
+            temperature=temperature,
+            **_request_options()
         )
         
         return response.choices[0].message.content.strip()
     
     except Exception as e:
+        if raise_errors:
+            raise
         # Fallback response if API call fails
         return f"Error generating response: {str(e)}. Based on the context provided, I cannot generate a proper response."
 
 
+async def stream_llm_response(
+    query: str,
+    context: str = "",
+    model: str = "gpt-4-turbo",
+    max_tokens: int = 1000,
+    temperature: float = 0.7,
+    raise_errors: bool = False
+) -> AsyncIterator[str]:
+    """
+    Stream the LLM response with context as it is generated. A failure ends
+    the stream with a fallback message unless raise_errors is set
+    """
+    try:
+        stream = await get_client().chat.completions.create(
+            model=model,
+            messages=_build_messages(query, context),
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True,
+            **_request_options()
+        )
+        
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
+    except Exception as e:
+        if raise_errors:
+            raise
+        # Fallback response if API call fails
+        yield f"Error generating response: {str(e)}. Based on the context provided, I cannot generate a proper response."
+
+
 async def get_multimodal_response(
     query: str,
     image_urls: Optional[list] = None,
@@ -70,21 +173,41 @@ async def get_multimodal_response(
         return await get_llm_response(query, context)
 
 
-async def get_embedding(text: str, model: str = "text-embedding-ada-002") -> list:
+# Most inputs the OpenAI embeddings endpoint accepts per request
+EMBEDDING_MAX_INPUTS = 2048
+
+
+async def get_embeddings(
+    texts: List[str],
+    model: str = "text-embedding-ada-002",
+    batch_size: int = EMBEDDING_MAX_INPUTS
+) -> List[np.ndarray]:
     """
-    Get embedding for text using OpenAI embeddings API
+    Get embeddings for several texts, with one OpenAI embeddings request per
+    batch_size texts, all in flight at once. A failed request raises rather
+    than handing back empty vectors.
     """
-    if settings.openai_api_key:
-        openai.api_key = settings.openai_api_key
-    else:
-        import os
-        openai.api_key = os.getenv("OPENAI_API_KEY")
-    
-    try:
-        response = await openai.Embedding.acreate(
-            input=text,
-            model=model
+    batch_size = min(batch_size, EMBEDDING_MAX_INPUTS)
+    responses = await asyncio.gather(*(
+        get_client().embeddings.create(
+            input=texts[start:start + batch_size],
+            model=model,
+            # base64 float32 payloads are ~4x smaller than JSON float lists and
+            # decode straight into arrays instead of one Python float per value
+            encoding_format="base64"
         )
-        return response.data[0].embedding
-    except Exception as e:
-        return []
\ No newline at end of file
+        for start in range(0, len(texts), batch_size)
+    ))
+    # Results carry their input index; order by it rather than trusting response order
+    return [
+        np.frombuffer(base64.b64decode(item.embedding), dtype=np.float32)
+        for response in responses
+        for item in sorted(response.data, key=lambda item: item.index)
+    ]
+
+
+async def get_embedding(text: str, model: str = "text-embedding-ada-002") -> np.ndarray:
+    """
+    Get embedding for text using OpenAI embeddings API
+    """
+    return (await get_embeddings([text], model))[0]
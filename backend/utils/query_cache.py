@@ -0,0 +1,72 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from ..config import settings
+
+
+class QueryCache:
+    """
+    Thread-safe LRU cache with per-entry TTL for query responses and listings.
+
+    Query responses are keyed by a hash of the query parameters; the least
+    recently used entry is evicted once max_size is reached, and expired
+    entries are dropped when they are looked up.
+    """
+
+    def __init__(self, max_size: int = 2000, ttl_seconds: float = 300):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def make_key(query: str, top_k: int, include_sources: bool) -> str:
+        """Hash the parameters that determine a query response"""
+        return hashlib.blake2b(f"{query}|{top_k}|{include_sources}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        """Store a value, evicting the least recently used entries if full"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry, e.g. after the indexed content changed"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Global cache for semantic search answers
+query_cache = QueryCache(
+    max_size=settings.query_cache_max_size,
+    ttl_seconds=settings.query_cache_ttl_seconds
+)
+
+# Global cache for paginated content listings, keyed on (limit, offset)
+metadata_cache = QueryCache(
+    max_size=settings.metadata_cache_max_size,
+    ttl_seconds=settings.metadata_cache_ttl_seconds
+)
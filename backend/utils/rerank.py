@@ -0,0 +1,110 @@
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from ..models.content import SearchResult
+
+
+class ChunkReranker:
+    """
+    Local store of normalized chunk embeddings for cosine re-ranking.
+
+    Vectors are kept per (file_id, chunk_id) as chunks are ingested, quantized
+    to int8 with a per-vector scale (a quarter of the float32 footprint), and
+    stacked into one contiguous matrix on the first rerank after a change, so
+    scoring a candidate pool is a single matrix-vector product.
+    """
+
+    def __init__(self):
+        self._vectors: Dict[Tuple[str, int], Tuple[np.ndarray, np.float32]] = {}
+        self._rows: Dict[Tuple[str, int], int] = {}
+        self._chunk_matrix = np.empty((0, 0), dtype=np.int8)
+        self._chunk_scales = np.empty(0, dtype=np.float32)
+        self._dirty = False
+
+    @staticmethod
+    def _quantize(vector: np.ndarray) -> Tuple[np.ndarray, np.float32]:
+        """Symmetric int8 quantization: vector ~= quantized * scale"""
+        scale = np.float32(np.abs(vector).max() / 127) if vector.size else np.float32(0)
+        if not scale:
+            return np.zeros(vector.shape, dtype=np.int8), np.float32(1)
+        return np.round(vector / scale).astype(np.int8), scale
+
+    def add_chunks(self, file_id: str, chunks: List[Dict[str, Any]]):
+        """Store the normalized, int8-quantized embedding of each chunk"""
+        for chunk in chunks:
+            vector = np.asarray(chunk['embedding'], dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            self._vectors[(file_id, chunk['chunk_id'])] = self._quantize(vector / norm if norm else vector)
+        self._dirty = True
+
+    def remove_file(self, file_id: str):
+        """Drop every chunk of a file"""
+        for key in [key for key in self._vectors if key[0] == file_id]:
+            del self._vectors[key]
+        self._dirty = True
+
+    def rerank(
+        self,
+        query_embedding: List[float],
+        candidates: List[SearchResult],
+        top_k: int = 5
+    ) -> List[SearchResult]:
+        """
+        Order candidates by cosine similarity to the query. Candidates without
+        a stored vector keep their relative order after the scored ones.
+        """
+        if self._dirty:
+            keys = list(self._vectors)
+            self._rows = {key: row for row, key in enumerate(keys)}
+            if keys:
+                self._chunk_matrix = np.stack([self._vectors[key][0] for key in keys])
+                self._chunk_scales = np.array([self._vectors[key][1] for key in keys], dtype=np.float32)
+            else:
+                self._chunk_matrix = np.empty((0, 0), dtype=np.int8)
+                self._chunk_scales = np.empty(0, dtype=np.float32)
+            self._dirty = False
+
+        rows, scored, unscored = [], [], []
+        for candidate in candidates:
+            row = self._rows.get((candidate.source.get('file_id'), candidate.source.get('chunk_id')))
+            if row is None:
+                unscored.append(candidate)
+            else:
+                rows.append(row)
+                scored.append(candidate)
+
+        if not scored:
+            return candidates[:top_k]
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        # Only the small candidate pool is dequantized; int8 products would
+        # overflow, and float32 keeps the product on BLAS
+        scores = (self._chunk_matrix[rows].astype(np.float32) @ query) * self._chunk_scales[rows]
+        if len(scores) > top_k:
+            top = np.argpartition(-scores, top_k)[:top_k]
+            top = top[np.argsort(-scores[top], kind='stable')]
+        else:
+            top = np.argsort(-scores, kind='stable')
+
+        reranked = [
+            SearchResult(
+                content=scored[i].content,
+                score=float(scores[i]),
+                source=scored[i].source,
+                chunk_id=scored[i].chunk_id
+            )
+            for i in top
+        ]
+        return (reranked + unscored)[:top_k]
+
+    def __len__(self) -> int:
+        return len(self._vectors)
+
+
+# Global reranker instance
+chunk_reranker = ChunkReranker()
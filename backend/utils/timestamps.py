@@ -0,0 +1,42 @@
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+
+def utc_now() -> datetime:
+    """
+    Timezone-aware replacement for the deprecated datetime.utcnow()
+    """
+    return datetime.now(timezone.utc)
+
+
+class WorkflowClock:
+    """
+    Monotonic clock anchored to a single wall-clock reading.
+
+    Records only carry a microsecond offset while a workflow runs; ISO
+    timestamps are formatted once, when the records are serialized.
+    """
+
+    __slots__ = ("started_at", "_start_ns")
+
+    def __init__(self):
+        self.started_at = utc_now()
+        self._start_ns = time.monotonic_ns()
+
+    def offset_us(self) -> int:
+        """Microseconds elapsed since the clock was started"""
+        return (time.monotonic_ns() - self._start_ns) // 1000
+
+    def isoformat(self, offset_us: int = None) -> str:
+        """ISO timestamp for an offset (defaults to now)"""
+        if offset_us is None:
+            offset_us = self.offset_us()
+        return (self.started_at + timedelta(microseconds=offset_us)).isoformat()
+
+    def stamp(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Add an ISO 'timestamp' to every record carrying a 't_offset_us'"""
+        for record in records:
+            if "t_offset_us" in record:
+                record["timestamp"] = self.isoformat(record["t_offset_us"])
+        return records
@@ -0,0 +1,110 @@
+import threading
+from typing import List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+# Past this many vectors an HNSW graph replaces the exact flat index
+HNSW_THRESHOLD = 100_000
+HNSW_M = 32
+
+
+class EmbeddingIndex:
+    """
+    In-process FAISS inner-product index over the SQLite embeddings table.
+
+    Vectors are L2-normalized, so inner product is cosine similarity, and
+    keyed by their embeddings row id. Inserted rows are appended on the next
+    search (row ids only grow, so only ids past max_id are read); deletes bump
+    the version and the index is rebuilt from the table.
+    """
+
+    def __init__(self):
+        self._index: Optional[faiss.Index] = None
+        self._dim: Optional[int] = None
+        self._built_version = -1
+        self.version = 0
+        self._synced_appends = 0
+        self.appends = 0
+        self.max_id = 0
+        self._lock = threading.Lock()
+
+    def mark_stale(self):
+        """Force a rebuild on the next search, e.g. after rows were deleted"""
+        self.version += 1
+
+    def mark_appended(self):
+        """Pick up newly inserted rows on the next search"""
+        self.appends += 1
+
+    def needs_build(self, dim: int) -> bool:
+        return self._built_version != self.version or self._dim != dim
+
+    def needs_sync(self) -> bool:
+        return self._synced_appends != self.appends
+
+    @staticmethod
+    def _normalized(vectors: List[np.ndarray], dim: int) -> np.ndarray:
+        if not vectors:
+            return np.empty((0, dim), dtype=np.float32)
+        # np.stack allocates one C-contiguous float32 matrix, which FAISS
+        # normalizes and adds in place without another copy
+        matrix = np.stack(vectors).astype(np.float32, copy=False)
+        faiss.normalize_L2(matrix)
+        return matrix
+
+    def build(self, ids: List[int], vectors: List[np.ndarray], dim: int, version: int, appends: int):
+        """
+        Replace the index with vectors read at the given version and append
+        count (blocking); writes made meanwhile are picked up by the next search
+        """
+        matrix = self._normalized(vectors, dim)
+        if len(matrix) > HNSW_THRESHOLD:
+            base = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        else:
+            base = faiss.IndexFlatIP(dim)
+        index = faiss.IndexIDMap(base)
+        index.add_with_ids(matrix, np.asarray(ids, dtype=np.int64))
+
+        with self._lock:
+            self._index = index
+            self._dim = dim
+            self._built_version = version
+            self._synced_appends = appends
+            self.max_id = max(ids, default=0)
+
+    def add(self, ids: List[int], vectors: List[np.ndarray], appends: int):
+        """Append rows inserted since the last build or add (blocking)"""
+        with self._lock:
+            # Skip rows a concurrent sync already added
+            new = [(row_id, vector) for row_id, vector in zip(ids, vectors) if row_id > self.max_id]
+            if new:
+                self._index.add_with_ids(
+                    self._normalized([vector for _, vector in new], self._dim),
+                    np.asarray([row_id for row_id, _ in new], dtype=np.int64)
+                )
+                self.max_id = max(self.max_id, new[-1][0])
+            self._synced_appends = max(self._synced_appends, appends)
+
+    def search(self, query_embedding, top_k: int = 5) -> List[Tuple[int, float]]:
+        """Return (row id, cosine score) pairs for the top_k vectors (blocking)"""
+        # A fresh C-contiguous row: normalize_L2 works in place, and
+        # ascontiguousarray would hand back the caller's float32 array
+        query = np.array(query_embedding, dtype=np.float32, order='C').reshape(1, -1)
+        faiss.normalize_L2(query)
+        
+        # Searched under the lock: add() grows the same FAISS index in place
+        with self._lock:
+            index = self._index
+            if index is None or index.ntotal == 0:
+                return []
+            scores, ids = index.search(query, min(top_k, index.ntotal))
+        return [
+            (int(row_id), float(score))
+            for row_id, score in zip(ids[0], scores[0])
+            if row_id != -1
+        ]
+
+
+# Global index over the embeddings table
+embedding_index = EmbeddingIndex()
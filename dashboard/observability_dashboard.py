@@ -6,10 +6,8 @@ Provides real-time visualization of metrics, logs, and system health
 
 import streamlit as st
 import requests
-import json
-import time
+import orjson
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import altair as alt
@@ -17,38 +15,92 @@ import altair as alt
 # Configuration
 API_BASE_URL = "http://localhost:8000/api/v1"
 REFRESH_INTERVAL = 5  # seconds
+HISTORY_LIMIT = 50  # most recent history entries to fetch and chart
+# History fields the charts and tables read; the rest are never materialized
+HISTORY_COLUMNS = ['timestamp', 'type', 'response_time', 'error_type', 'error_message']
 
-def get_metrics():
-    """Fetch metrics from the backend API"""
+@st.cache_resource
+def get_session():
+    """HTTP session shared across reruns, keeping connections to the backend alive"""
+    session = requests.Session()
+    session.mount('http://', requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=8))
+    return session
+
+def fetch_all():
+    """
+    Fetch health, metrics and recent history from the backend in one round-trip;
+    returns (is_healthy, metrics, history_df) with history timestamps parsed
+    """
+    # The last bundle is kept per session with its ETag; while the metrics are
+    # unchanged the backend answers 304 and nothing is parsed or rebuilt
+    cached = st.session_state.get('bundle')
+    headers = {'If-None-Match': cached[0]} if cached else {}
     try:
-        response = requests.get(f"{API_BASE_URL}/logging/metrics/detailed", timeout=5)
-        if response.status_code == 200:
-            return response.json()
-        else:
+        response = get_session().get(
+            f"{API_BASE_URL}/logging/metrics/bundle",
+            params={"history_limit": HISTORY_LIMIT},
+            headers=headers,
+            timeout=5
+        )
+        if response.status_code == 304 and cached:
+            return cached[1]
+        if response.status_code != 200:
             st.error(f"Failed to fetch metrics: {response.status_code}")
-            return None
+            return False, None, pd.DataFrame()
+        bundle = orjson.loads(response.content)
     except Exception as e:
         st.error(f"Error connecting to backend: {str(e)}")
-        return None
+        return False, None, pd.DataFrame()
+    
+    history_df = pd.DataFrame.from_records(bundle['history'], columns=HISTORY_COLUMNS)
+    if not history_df.empty:
+        history_df['timestamp'] = pd.to_datetime(history_df['timestamp'])
+    result = (bundle['healthy'], bundle['metrics'], history_df)
+    etag = response.headers.get('ETag')
+    if etag:
+        st.session_state['bundle'] = (etag, result)
+    return result
 
-def get_metrics_history():
-    """Fetch metrics history"""
-    try:
-        response = requests.get(f"{API_BASE_URL}/logging/metrics/history", timeout=5)
-        if response.status_code == 200:
-            return response.json().get('history', [])
-        else:
-            return []
-    except Exception:
-        return []
+def cached_figure(key, build):
+    """Figure skeleton kept for this session, so reruns only swap in new trace data"""
+    # Per session rather than st.cache_resource: figures are mutated on every rerun
+    figures = st.session_state.setdefault('figures', {})
+    if key not in figures:
+        figures[key] = build()
+    return figures[key]
 
-def get_health_status():
-    """Check system health"""
-    try:
-        response = requests.get(f"{API_BASE_URL}/logging/health", timeout=3)
-        return response.status_code == 200
-    except Exception:
-        return False
+def _percentile_figure():
+    fig = go.Figure(go.Bar(
+        x=['50th', '90th', '95th', '99th'],
+        marker_color=['#2E8B57', '#FFA500', '#FF6347', '#DC143C']
+    ))
+    fig.update_layout(showlegend=False, xaxis_title='Percentile', yaxis_title='Response Time (s)')
+    return fig
+
+def _operations_figure():
+    fig = go.Figure(go.Pie())
+    fig.update_layout(title='Operations Distribution')
+    return fig
+
+def _response_time_figure():
+    fig = go.Figure(go.Scatter(mode='lines'))
+    fig.update_layout(title='Query Response Times Over Time', xaxis_title='timestamp', yaxis_title='response_time')
+    return fig
+
+def _activity_figure():
+    fig = go.Figure(go.Bar())
+    fig.update_layout(title='Activity Distribution', xaxis_title='Activity Type', yaxis_title='Count')
+    return fig
+
+def _error_types_figure():
+    fig = go.Figure(go.Bar(marker=dict(colorscale='Plasma', showscale=True, colorbar=dict(title='Count'))))
+    fig.update_layout(title='Error Types Distribution', xaxis_title='Error Type', yaxis_title='Count')
+    return fig
+
+def _endpoint_success_figure():
+    fig = go.Figure(go.Bar(marker=dict(colorscale='RdYlGn', showscale=True, colorbar=dict(title='Success Rate (%)'))))
+    fig.update_layout(title='Endpoint Success Rates', xaxis_title='Endpoint', yaxis_title='Success Rate (%)')
+    return fig
 
 def main():
     st.set_page_config(
@@ -61,10 +113,23 @@ def main():
     st.title("📊 AI Content Analytics - Observability Dashboard")
     st.markdown("---")
     
+    render_live_metrics()
+    
+    # Manual refresh
+    st.markdown("---")
+    if st.button("🔄 Refresh Now"):
+        st.session_state.pop('bundle', None)
+        st.rerun()
+
+# Only this fragment reruns on the timer; the page around it is left as is
+@st.fragment(run_every=REFRESH_INTERVAL)
+def render_live_metrics():
+    """Health indicator and metric tabs, refreshed every REFRESH_INTERVAL seconds"""
+    is_healthy, metrics, history_df = fetch_all()
+    
     # Health status indicator
     health_col1, health_col2 = st.columns([1, 5])
     with health_col1:
-        is_healthy = get_health_status()
         if is_healthy:
             st.success("✓ System Healthy")
         else:
@@ -73,8 +138,6 @@ def main():
     with health_col2:
         st.caption(f"Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
-    # Fetch metrics
-    metrics = get_metrics()
     if not metrics:
         st.error("Unable to fetch metrics. Please ensure the backend is running.")
         return
@@ -126,29 +189,13 @@ def main():
         st.subheader("Response Time Percentiles")
         percentiles = metrics.get('response_time_percentiles', {})
         if percentiles:
-            percentile_data = pd.DataFrame({
-                'Percentile': ['50th', '90th', '95th', '99th'],
-                'Response Time (s)': [
-                    percentiles.get('p50', 0),
-                    percentiles.get('p90', 0),
-                    percentiles.get('p95', 0),
-                    percentiles.get('p99', 0)
-                ]
-            })
-            
-            fig = px.bar(
-                percentile_data,
-                x='Percentile',
-                y='Response Time (s)',
-                color='Percentile',
-                color_discrete_map={
-                    '50th': '#2E8B57',
-                    '90th': '#FFA500',
-                    '95th': '#FF6347',
-                    '99th': '#DC143C'
-                }
-            )
-            fig.update_layout(showlegend=False)
+            fig = cached_figure('percentiles', _percentile_figure)
+            fig.update_traces(y=[
+                percentiles.get('p50', 0),
+                percentiles.get('p90', 0),
+                percentiles.get('p95', 0),
+                percentiles.get('p99', 0)
+            ])
             st.plotly_chart(fig, use_container_width=True)
         
         # Operation counts
@@ -160,12 +207,8 @@ def main():
             'API Requests': metrics.get('api_request_count', 0)
         }
         
-        op_df = pd.DataFrame({
-            'Operation': list(operation_counts.keys()),
-            'Count': list(operation_counts.values())
-        })
-        
-        fig2 = px.pie(op_df, values='Count', names='Operation', title='Operations Distribution')
+        fig2 = cached_figure('operations', _operations_figure)
+        fig2.update_traces(labels=list(operation_counts.keys()), values=list(operation_counts.values()))
         st.plotly_chart(fig2, use_container_width=True)
     
     with tab2:
@@ -184,82 +227,49 @@ def main():
         
         # Response time trend (if we had historical data)
         st.subheader("Recent Activity")
-        history = get_metrics_history()
-        if history:
-            # Filter recent entries for visualization
-            recent_history = history[-50:]  # Last 50 entries
-            
-            # Create dataframe for plotting
-            history_df = pd.DataFrame(recent_history)
-            if not history_df.empty:
-                # Convert timestamps
-                history_df['timestamp'] = pd.to_datetime(history_df['timestamp'])
-                
-                # Response time chart
-                response_times = history_df[history_df['type'] == 'query']
-                if not response_times.empty:
-                    st.subheader("Recent Query Response Times")
-                    response_fig = px.line(
-                        response_times,
-                        x='timestamp',
-                        y='response_time',
-                        title='Query Response Times Over Time'
-                    )
-                    st.plotly_chart(response_fig, use_container_width=True)
-                
-                # Activity timeline
-                st.subheader("Activity Timeline")
-                activity_counts = history_df['type'].value_counts()
-                activity_fig = px.bar(
-                    x=activity_counts.index,
-                    y=activity_counts.values,
-                    title='Activity Distribution'
-                )
-                activity_fig.update_layout(xaxis_title='Activity Type', yaxis_title='Count')
-                st.plotly_chart(activity_fig, use_container_width=True)
+        if not history_df.empty:
+            # Response time chart
+            response_times = history_df[history_df['type'] == 'query']
+            if not response_times.empty:
+                st.subheader("Recent Query Response Times")
+                response_fig = cached_figure('response_times', _response_time_figure)
+                response_fig.update_traces(x=response_times['timestamp'], y=response_times['response_time'])
+                st.plotly_chart(response_fig, use_container_width=True)
+        
+        # Activity timeline, from the counts the backend keeps per entry type
+        activity_counts = metrics.get('activity_counts', {})
+        if activity_counts:
+            st.subheader("Activity Timeline")
+            activity_fig = cached_figure('activity', _activity_figure)
+            activity_fig.update_traces(x=list(activity_counts.keys()), y=list(activity_counts.values()))
+            st.plotly_chart(activity_fig, use_container_width=True)
     
     with tab3:
         st.subheader("Error Analysis")
         
-        error_metrics = {
-            'Total Errors': metrics.get('error_count', 0),
-            'Failed Requests': metrics.get('failed_requests', 0)
-        }
-        
         # Error metrics
         error_col1, error_col2 = st.columns(2)
         with error_col1:
-            st.metric("Total Errors", error_metrics['Total Errors'])
+            st.metric("Total Errors", metrics.get('error_count', 0))
         with error_col2:
-            st.metric("Failed Requests", error_metrics['Failed Requests'])
+            st.metric("Failed Requests", metrics.get('failed_requests', 0))
         
         # Error types breakdown
         error_types = metrics.get('error_types', {})
         if error_types:
             st.subheader("Error Types Breakdown")
-            error_df = pd.DataFrame({
-                'Error Type': list(error_types.keys()),
-                'Count': list(error_types.values())
-            })
-            
-            error_fig = px.bar(
-                error_df,
-                x='Error Type',
-                y='Count',
-                title='Error Types Distribution',
-                color='Count'
-            )
+            counts = list(error_types.values())
+            error_fig = cached_figure('error_types', _error_types_figure)
+            error_fig.update_traces(x=list(error_types.keys()), y=counts, marker_color=counts)
             st.plotly_chart(error_fig, use_container_width=True)
         
-        # Recent errors table
-        history = get_metrics_history()
-        if history:
-            error_entries = [entry for entry in history[-20:] if entry.get('type') == 'error']
-            if error_entries:
+        # Recent errors table; history is append-ordered, so the last rows are the newest
+        if not history_df.empty:
+            error_table = history_df[history_df['type'] == 'error']
+            if not error_table.empty:
                 st.subheader("Recent Errors")
-                error_table = pd.DataFrame(error_entries)
                 st.dataframe(
-                    error_table[['timestamp', 'error_type', 'error_message']].head(10),
+                    error_table[['timestamp', 'error_type', 'error_message']].tail(10),
                     use_container_width=True
                 )
     
@@ -268,22 +278,17 @@ def main():
         
         endpoint_metrics = metrics.get('endpoint_metrics', {})
         if endpoint_metrics:
-            # Endpoint performance table
-            endpoint_data = []
-            for endpoint, data in endpoint_metrics.items():
-                success_rate = (data['successful_requests'] / data['total_requests'] * 100) if data['total_requests'] > 0 else 0
-                avg_response_time = (data['total_response_time'] / data['total_requests']) if data['total_requests'] > 0 else 0
-                
-                endpoint_data.append({
-                    'Endpoint': endpoint,
-                    'Total Requests': data['total_requests'],
-                    'Success Rate (%)': round(success_rate, 2),
-                    'Avg Response Time (s)': round(avg_response_time, 3),
-                    'Successful': data['successful_requests'],
-                    'Failed': data['failed_requests']
-                })
-            
-            endpoint_df = pd.DataFrame(endpoint_data)
+            # Endpoint performance table, with the rates computed column-wise
+            stats = pd.DataFrame.from_dict(endpoint_metrics, orient='index')
+            totals = stats['total_requests'].where(stats['total_requests'] > 0)
+            endpoint_df = pd.DataFrame({
+                'Endpoint': stats.index,
+                'Total Requests': stats['total_requests'],
+                'Success Rate (%)': (stats['successful_requests'] / totals * 100).round(2).fillna(0),
+                'Avg Response Time (s)': (stats['total_response_time'] / totals).round(3).fillna(0),
+                'Successful': stats['successful_requests'],
+                'Failed': stats['failed_requests']
+            }).reset_index(drop=True)
             
             # Sort by total requests
             endpoint_df = endpoint_df.sort_values('Total Requests', ascending=False)
@@ -292,26 +297,12 @@ def main():
             
             # Endpoint success rate chart
             st.subheader("Endpoint Success Rates")
-            success_fig = px.bar(
-                endpoint_df,
-                x='Endpoint',
-                y='Success Rate (%)',
-                title='Endpoint Success Rates',
-                color='Success Rate (%)',
-                color_continuous_scale='RdYlGn'
-            )
+            success_rates = endpoint_df['Success Rate (%)']
+            success_fig = cached_figure('endpoint_success', _endpoint_success_figure)
+            success_fig.update_traces(x=endpoint_df['Endpoint'], y=success_rates, marker_color=success_rates)
             st.plotly_chart(success_fig, use_container_width=True)
         else:
             st.info("No endpoint metrics available yet.")
-    
-    # Auto-refresh
-    st.markdown("---")
-    if st.button("🔄 Refresh Now"):
-        st.experimental_rerun()
-    
-    # Auto-refresh timer
-    time.sleep(REFRESH_INTERVAL)
-    st.experimental_rerun()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -6,32 +6,23 @@ Automates the setup process described in DEVELOPMENT_GUIDE.md
 
 import os
 import sys
+import shlex
 import subprocess
 import shutil
 from pathlib import Path
 
-def run_command(command, cwd=None, description=""):
-    """Run a shell command and handle errors"""
+def run_command(args, cwd=None, description=""):
+    """Run a command (argument list, no shell) with its output streamed live"""
     if description:
         print(f"\n🔄 {description}")
-        print(f"   Command: {command}")
+        print(f"   Command: {shlex.join(str(arg) for arg in args)}", flush=True)
     
     try:
-        result = subprocess.run(
-            command, 
-            shell=True, 
-            cwd=cwd, 
-            capture_output=True, 
-            text=True,
-            check=True
-        )
-        if result.stdout:
-            print(f"   Output: {result.stdout.strip()}")
+        # Inherited stdio lets pip/npm progress through as it happens
+        subprocess.run(args, cwd=cwd, check=True)
         return True
-    except subprocess.CalledProcessError as e:
+    except (subprocess.CalledProcessError, OSError) as e:
         print(f"   ❌ Failed: {e}")
-        if e.stderr:
-            print(f"   Error: {e.stderr.strip()}")
         return False
 
 def create_directory(path):
@@ -58,42 +49,41 @@ def main():
     
     # Create virtual environment
     if not (backend_dir / "venv").exists():
-        if not run_command("python -m venv venv", cwd=backend_dir, 
+        if not run_command([sys.executable, "-m", "venv", "venv"], cwd=backend_dir, 
                           description="Creating virtual environment"):
             return False
     
-    # Activate virtual environment and install dependencies
-    venv_activate = "venv\\Scripts\\activate" if os.name == "nt" else "source venv/bin/activate"
+    # Use the virtual environment's interpreter directly rather than activating it
+    venv_python = backend_dir / "venv" / ("Scripts" if os.name == "nt" else "bin") / "python"
     
     print("\n📦 Installing backend dependencies...")
+    # One pip run resolves the requirements and the development install together
+    pip_cmd = [str(venv_python), "-m", "pip", "install", "--prefer-binary"]
     requirements_file = backend_dir / "requirements.txt"
     if requirements_file.exists():
-        # Install requirements
-        pip_cmd = f"{venv_activate} && pip install -r requirements.txt"
-        if not run_command(pip_cmd, cwd=backend_dir, 
-                          description="Installing Python dependencies"):
-            return False
+        pip_cmd += ["-r", "requirements.txt"]
+        description = "Installing Python dependencies"
     else:
         # Install basic dependencies
-        basic_deps = "fastapi uvicorn pydantic python-multipart"
-        pip_cmd = f"{venv_activate} && pip install {basic_deps}"
-        if not run_command(pip_cmd, cwd=backend_dir, 
-                          description="Installing basic dependencies"):
-            return False
+        pip_cmd += ["fastapi", "uvicorn", "pydantic", "python-multipart"]
+        description = "Installing basic dependencies"
     
     # Install in development mode
     if (backend_dir / "setup.py").exists():
-        pip_cmd = f"{venv_activate} && pip install -e ."
-        if not run_command(pip_cmd, cwd=backend_dir, 
-                          description="Installing package in development mode"):
-            return False
+        pip_cmd += ["-e", "."]
+        description += " and the package in development mode"
+    
+    if not run_command(pip_cmd, cwd=backend_dir, description=description):
+        return False
     
     # Step 2: Setup frontend
     print("\n🎨 Setting up Frontend...")
     frontend_dir = project_root / "frontend"
     
     if frontend_dir.exists():
-        if not run_command("npm install", cwd=frontend_dir, 
+        # npm is a .cmd script on Windows, which needs its full path without a shell
+        npm = shutil.which("npm") or "npm"
+        if not run_command([npm, "install"], cwd=frontend_dir, 
                           description="Installing frontend dependencies"):
             return False
     else:
@@ -113,7 +103,7 @@ def main():
     print("\n🧪 Testing setup...")
     
     # Test backend imports
-    test_cmd = f"{venv_activate} && python -c \"from backend.main import app; print('✅ Backend imports working')\""
+    test_cmd = [str(venv_python), "-c", "from backend.main import app; print('✅ Backend imports working')"]
     if run_command(test_cmd, cwd=project_root, 
                    description="Testing backend imports"):
         print("   ✅ Backend setup successful!")
@@ -13,10 +13,21 @@ sys.path.insert(0, str(backend_path))
 # Set current working directory to backend
 os.chdir(backend_path)
 
-# Import and run the FastAPI app
-from main import app
-
 if __name__ == "__main__":
     import uvicorn
+    
+    # Metrics, evaluation history and the vector index live in process memory,
+    # so more than one worker is opt-in; each worker imports the app itself
+    workers = int(os.getenv("BACKEND_WORKERS", "1"))
+    
     print("Starting backend server on http://127.0.0.1:8000")
-    uvicorn.run(app, host="127.0.0.1", port=8000)
\ No newline at end of file
+    uvicorn.run(
+        "main:app",
+        host="127.0.0.1",
+        port=8000,
+        # "auto" picks uvloop and httptools (installed with uvicorn[standard])
+        # when importable and the pure-Python fallbacks otherwise
+        loop="auto",
+        http="auto",
+        workers=workers
+    )
\ No newline at end of file
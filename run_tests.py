@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Run the top-level test scripts in one interpreter, so backend, torch,
+transformers and the Pinecone client are imported once rather than per script
+"""
+import asyncio
+import importlib
+import inspect
+import os
+import sys
+import traceback
+
+# Script module -> entry point, in the order they are run
+SCRIPTS = {
+    "test_backend_functionality": "main",
+    "test_blip2": "test_blip2",
+    "test_evaluation": "test_evaluation_features",
+    "test_logging": "test_logging_features",
+    "test_pinecone_rag": "main",
+}
+
+
+def report_failure(label, error):
+    """Print a one-line failure for a test script; TEST_VERBOSE=1 adds the traceback"""
+    print(f"✗ Error during {label}: {type(error).__name__}: {error}")
+    if os.getenv("TEST_VERBOSE"):
+        traceback.print_exception(type(error), error, error.__traceback__)
+
+
+def run(selected):
+    # One loop for every script: services keep loop-bound clients and pools
+    # between calls
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        for name in selected:
+            print(f"\n▶️  {name}")
+            module = importlib.import_module(name)
+            entry = getattr(module, SCRIPTS[name])
+            if name == "test_backend_functionality":
+                result = entry(list(module.TESTS))
+            else:
+                result = entry()
+            if inspect.isawaitable(result):
+                loop.run_until_complete(result)
+    finally:
+        loop.close()
+
+
+if __name__ == "__main__":
+    # Optionally name the scripts to run, e.g. `python run_tests.py test_logging test_evaluation`
+    selected = sys.argv[1:] or list(SCRIPTS)
+    unknown = [name for name in selected if name not in SCRIPTS]
+    if unknown:
+        sys.exit(f"Unknown scripts: {', '.join(unknown)} (choose from {', '.join(SCRIPTS)})")
+    run(selected)
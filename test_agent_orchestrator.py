@@ -4,6 +4,7 @@ Test script to verify multi-step agent orchestrator functionality
 import asyncio
 from backend.services.agent_orchestrator import agent_orchestrator
 from backend.services.agent import Agent
+from run_tests import report_failure
 
 async def test_agent_orchestrator():
     """Test the multi-step agent orchestrator"""
@@ -61,16 +62,6 @@ async def test_agent_orchestrator():
             'query': 'What are the current trends in artificial intelligence?'
         }
         
-        result = await agent_orchestrator.execute_workflow(
-            workflow_id="research_workflow",
-            initial_context=context,
-            max_steps=5
-        )
-        
-        print(f"✓ Workflow executed successfully")
-        print(f"  Status: {result['status']}")
-        print(f"  Results count: {len(result['results'])}")
-        
         # Test the agent task execution
         task = {
             'task_id': 'test_task_1',
@@ -79,8 +70,20 @@ async def test_agent_orchestrator():
             'context': {}
         }
         
+        # The workflow and the agent task are independent, so run them concurrently
         agent = agent_orchestrator.agents["test_research_agent"]
-        task_result = await agent.execute_task(task)
+        result, task_result = await asyncio.gather(
+            agent_orchestrator.execute_workflow(
+                workflow_id="research_workflow",
+                initial_context=context,
+                max_steps=5
+            ),
+            agent.execute_task(task)
+        )
+        
+        print(f"✓ Workflow executed successfully")
+        print(f"  Status: {result['status']}")
+        print(f"  Results count: {len(result['results'])}")
         print(f"✓ Agent task executed: {task_result['status']}")
         
         # List agents
@@ -94,9 +97,13 @@ async def test_agent_orchestrator():
         print("\n✓ Multi-Step Agent Orchestrator tests completed successfully!")
         
     except Exception as e:
-        print(f"✗ Error during testing: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        report_failure("testing", e)
 
 if __name__ == "__main__":
+    try:
+        # uvloop ships with uvicorn[standard]; fall back to the stdlib loop without it
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
     asyncio.run(test_agent_orchestrator())
\ No newline at end of file
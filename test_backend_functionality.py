@@ -2,73 +2,115 @@
 """
 Test script to verify backend functionality in virtual environment
 """
+import io
 import sys
 import os
-from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
 
-# Add backend directory to Python path
-backend_path = Path(__file__).parent / "backend"
-sys.path.insert(0, str(backend_path))
+# Everything is imported as the backend package, which resolves from this
+# script's directory; putting backend/ itself on sys.path would also let
+# backend/logging shadow the stdlib logging module
 
-print("🔍 Testing backend functionality in virtual environment...")
-print("=" * 50)
+def test_models():
+    print("1️⃣  Testing models...")
+    try:
+        from backend.models.content import ContentType, FileUploadResponse, QueryRequest
+        print("   ✅ Models imported successfully")
+        print(f"   📦 Available content types: {[t.value for t in ContentType]}")
+    except Exception as e:
+        print(f"   ❌ Models import failed: {e}")
 
-# Test 1: Models
-print("1️⃣  Testing models...")
-try:
-    from backend.models.content import ContentType, FileUploadResponse, QueryRequest
-    print("   ✅ Models imported successfully")
-    print(f"   📦 Available content types: {[t.value for t in ContentType]}")
-except Exception as e:
-    print(f"   ❌ Models import failed: {e}")
+def test_configuration():
+    print("\n2️⃣  Testing configuration...")
+    try:
+        from backend.config.settings import get_settings
+        settings = get_settings()
+        print("   ✅ Configuration loaded successfully")
+        print(f"   ⚙️  Embedding model: {settings.embedding_model}")
+        print(f"   📏 Embedding dimension: {settings.embedding_dimension}")
+    except Exception as e:
+        print(f"   ❌ Configuration load failed: {e}")
 
-# Test 2: Configuration
-print("\n2️⃣  Testing configuration...")
-try:
-    from backend.config.settings import settings
-    print("   ✅ Configuration loaded successfully")
-    print(f"   ⚙️  Embedding model: {settings.embedding_model}")
-    print(f"   📏 Embedding dimension: {settings.embedding_dimension}")
-except Exception as e:
-    print(f"   ❌ Configuration load failed: {e}")
+def test_database():
+    print("\n3️⃣  Testing database utilities...")
+    try:
+        from backend.utils.database import init_db, save_content_metadata
+        print("   ✅ Database utilities imported successfully")
+        print("   🗄️  Database functions available")
+    except Exception as e:
+        print(f"   ❌ Database utilities import failed: {e}")
 
-# Test 3: Database utilities
-print("\n3️⃣  Testing database utilities...")
-try:
-    from backend.utils.database import init_db, save_content_metadata
-    print("   ✅ Database utilities imported successfully")
-    print("   🗄️  Database functions available")
-except Exception as e:
-    print(f"   ❌ Database utilities import failed: {e}")
+def test_embeddings():
+    print("\n4️⃣  Testing embedding service...")
+    try:
+        from backend.utils.embeddings import embedding_service
+        print("   ✅ Embedding service imported successfully")
+        print(f"   🧠 Embedding provider: {embedding_service.provider}")
+    except Exception as e:
+        print(f"   ❌ Embedding service import failed: {e}")
 
-# Test 4: Embedding service
-print("\n4️⃣  Testing embedding service...")
-try:
-    from backend.utils.embeddings import embedding_service
-    print("   ✅ Embedding service imported successfully")
-    print(f"   🧠 Embedding provider: {embedding_service.provider}")
-except Exception as e:
-    print(f"   ❌ Embedding service import failed: {e}")
+def test_evaluation():
+    print("\n5️⃣  Testing evaluation service...")
+    try:
+        from backend.evaluation.evaluation_service import evaluation_service
+        print("   ✅ Evaluation service imported successfully")
+        print("   📊 Evaluation features available")
+    except Exception as e:
+        print(f"   ❌ Evaluation service import failed: {e}")
 
-# Test 5: Evaluation service
-print("\n5️⃣  Testing evaluation service...")
-try:
-    from backend.evaluation.evaluation_service import evaluation_service
-    print("   ✅ Evaluation service imported successfully")
-    print("   📊 Evaluation features available")
-except Exception as e:
-    print(f"   ❌ Evaluation service import failed: {e}")
+# Each test imports only what it checks, so a subset run skips the other stacks
+TESTS = {
+    "models": test_models,
+    "config": test_configuration,
+    "database": test_database,
+    "embeddings": test_embeddings,
+    "evaluation": test_evaluation,
+}
 
-print("\n" + "=" * 50)
-print("📋 Summary:")
-print("✅ Virtual environment is properly set up")
-print("✅ Core backend components are functional")
-print("✅ All major services can be imported")
-print("⚠️  Server startup has relative import issues (known limitation)")
-print("💡 Solution: Use Docker or cloud deployment for full server functionality")
+# Closing banner, written in one go after the tests
+SUMMARY = """
+==================================================
+📋 Summary:
+✅ Virtual environment is properly set up
+✅ Core backend components are functional
+✅ All major services can be imported
+⚠️  Server startup has relative import issues (known limitation)
+💡 Solution: Use Docker or cloud deployment for full server functionality
 
-print("\n🚀 Ready for deployment!")
-print("The backend is functionally complete and can be deployed using:")
-print("   • Docker (recommended)")
-print("   • Cloud platforms (AWS, GCP, Azure)")
-print("   • Production WSGI servers")
\ No newline at end of file
+🚀 Ready for deployment!
+The backend is functionally complete and can be deployed using:
+   • Docker (recommended)
+   • Cloud platforms (AWS, GCP, Azure)
+   • Production WSGI servers
+"""
+
+def _run_captured(name):
+    """Run one test in a worker process, returning its output"""
+    output = io.StringIO()
+    with redirect_stdout(output):
+        TESTS[name]()
+    return output.getvalue()
+
+def main(selected, parallel=False):
+    print("🔍 Testing backend functionality in virtual environment...\n" + "=" * 50)
+    
+    if parallel and len(selected) > 1:
+        # The tests are independent import probes, so each runs in its own
+        # process; their output is still printed in test order
+        with ProcessPoolExecutor(max_workers=len(selected)) as pool:
+            for output in pool.map(_run_captured, selected):
+                sys.stdout.write(output)
+    else:
+        for name in selected:
+            TESTS[name]()
+    
+    sys.stdout.write(SUMMARY)
+
+if __name__ == "__main__":
+    # Optionally name the tests to run, e.g. `python test_backend_functionality.py config database`
+    selected = sys.argv[1:] or list(TESTS)
+    unknown = [name for name in selected if name not in TESTS]
+    if unknown:
+        sys.exit(f"Unknown tests: {', '.join(unknown)} (choose from {', '.join(TESTS)})")
+    main(selected, parallel=True)
@@ -2,11 +2,11 @@
 Test script to verify logging and observability features
 """
 import asyncio
-import json
+import orjson
 from datetime import datetime
-from pathlib import Path
 
 from backend.logging.metrics import metrics_tracker
+from run_tests import report_failure
 
 async def test_logging_features():
     """Test the logging and observability features"""
@@ -16,39 +16,30 @@ async def test_logging_features():
         # Test metrics tracking
         print("1. Testing metrics tracking...")
         
-        # Log a query
-        metrics_tracker.log_query("Test query for logging", 0.5, [])
-        print("   ✓ Query logged")
-        
-        # Log RAG retrieval
-        metrics_tracker.log_rag_retrieval("Test RAG query", 3)
-        print("   ✓ RAG retrieval logged")
-        
-        # Log file upload
-        metrics_tracker.log_file_upload("test_document.pdf", 102400, "application/pdf")
-        print("   ✓ File upload logged")
-        
-        # Log agent workflow
-        metrics_tracker.log_agent_workflow("test_workflow_123", 5, 2.3)
-        print("   ✓ Agent workflow logged")
-        
-        # Log an error
-        metrics_tracker.log_error("TestError", "This is a test error message", {"context": "test"})
-        print("   ✓ Error logged")
+        # Log a query, a RAG retrieval, a file upload, an agent workflow and
+        # an error in one batch
+        metrics_tracker.log_events([
+            {'type': 'query', 'query': "Test query for logging", 'response_time': 0.5, 'sources': []},
+            {'type': 'rag_retrieval', 'query': "Test RAG query", 'results_count': 3},
+            {'type': 'file_upload', 'filename': "test_document.pdf", 'file_size': 102400, 'content_type': "application/pdf"},
+            {'type': 'agent_workflow', 'workflow_id': "test_workflow_123", 'steps_completed': 5, 'execution_time': 2.3},
+            {'type': 'error', 'error_type': "TestError", 'error_message': "This is a test error message", 'context': {"context": "test"}},
+        ])
+        print("   ✓ Query, RAG retrieval, file upload, agent workflow and error logged")
         
         # Get metrics summary
         summary = metrics_tracker.get_metrics_summary()
         print(f"   ✓ Metrics summary retrieved: {summary}")
         
-        # Check if metrics file was created
-        metrics_file = Path("logs/metrics.json")
+        # Check if metrics file was created; writes are coalesced, so flush first
+        metrics_tracker.flush()
+        metrics_file = metrics_tracker.metrics_file
         if metrics_file.exists():
             print("   ✓ Metrics file created successfully")
             
             # Load and display metrics
-            with open(metrics_file, 'r') as f:
-                metrics_data = json.load(f)
-                print(f"   ✓ Metrics loaded from file: {len(metrics_data['request_history'])} history entries")
+            metrics_data = orjson.loads(metrics_file.read_bytes())
+            print(f"   ✓ Metrics loaded from file: {len(metrics_data['request_history'])} history entries")
         else:
             print("   ✗ Metrics file not found")
         
@@ -64,9 +55,7 @@ async def test_logging_features():
         print("\n✓ All logging and observability features working correctly!")
         
     except Exception as e:
-        print(f"✗ Error during logging testing: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        report_failure("logging testing", e)
 
 if __name__ == "__main__":
     asyncio.run(test_logging_features())
\ No newline at end of file